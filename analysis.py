@@ -0,0 +1,127 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# vectorised versions of the per-row helpers in Challenge.ipynb
+# each one gives the same result as the notebook cell it replaces
+
+# categories counted as essential by essential() in the notebook
+# ("health " keeps the notebook's trailing space, so health spending stays non-essential as before)
+ESSENTIAL_CATEGORIES = ["service", "convenience store", "supermarket", "drugstore", "gas",
+                        "health ", "clothing", "construction material", "auto", "furniture", "financial transfers"]
+
+# age_divide() buckets; anything from 50 up (and missing ages) falls in ">60" like in the notebook
+AGE_BINS = [-np.inf, 20, 30, 40, 50, np.inf]
+AGE_LABELS = ["<20", "20-30", "30-40", "40-50", ">60"]
+
+
+# origin["category"].apply(essential)
+def essential_flag(category):
+    return category.isin(ESSENTIAL_CATEGORIES).astype(int)
+
+
+# origin["age"].apply(lambda x: age_divide(x))
+def age_group(age):
+    return pd.cut(age, bins=AGE_BINS, labels=AGE_LABELS, right=False).fillna(">60")
+
+
+# origin["new_id"].apply(lambda x: x in user_dic[key])
+def user_mask(new_id, users):
+    return new_id.isin(list(users))
+
+
+# datetime.apply(lambda x: x.strftime("%y-%m")), formatting each distinct date only once
+def year_month(datetime):
+    codes, uniques = pd.factorize(datetime)
+    # missing dates get code -1, which picks the trailing NaN
+    labels = np.append(pd.DatetimeIndex(uniques).strftime("%y-%m").to_numpy(dtype=object), np.nan)
+    return pd.Series(labels[codes], index=datetime.index)
+
+
+# add the year_month column once; later calls reuse it instead of formatting again
+def add_year_month(df):
+    if "year_month" not in df:
+        df["year_month"] = year_month(df["datetime"])
+    return df
+
+
+# select_data() from the notebook
+def select_data(origin, users, since="2020-01-01"):
+    temp = origin[user_mask(origin["new_id"], users)]
+    df = temp[temp["datetime"] > since]
+
+    toplot1 = df.groupby(["month", "essential"])["amount"].sum().reset_index()
+    toplot1["amount"] = toplot1["amount"] / len(users)
+    non_essential = df[df["essential"] == 0].groupby("month")["amount"].sum()
+    total = df.groupby("month")["amount"].sum()
+    return toplot1, non_essential / total
+
+
+# the data behind graph_limit() from the notebook
+def limit_spending(origin, users):
+    df = add_year_month(origin)[user_mask(origin["new_id"], users)]
+    toplot2 = df.groupby("year_month")["amount"].sum().reset_index()
+    toplot2["amount"] = toplot2["amount"] / len(users)
+    return toplot2
+
+
+def synthetic_origin(rows, users=30, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = list(dict.fromkeys(ESSENTIAL_CATEGORIES + ["online", "electronics", "restaurant", "airlines"]))
+    return pd.DataFrame({
+        "new_id": rng.integers(0, users, rows),
+        "category": rng.choice(categories, rows),
+        "age": rng.integers(18, 70, rows),
+        "amount": rng.gamma(2, 50, rows).round(2),
+        "datetime": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 500, rows), unit="D")
+    })
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+# compare each notebook apply() with its vectorised replacement on a synthetic frame
+def benchmark(rows=3000000):
+    origin = synthetic_origin(rows)
+    users = [4, 10, 23]
+
+    def essential(data):
+        return 1 if data in ESSENTIAL_CATEGORIES else 0
+
+    def age_divide(data):
+        if data < 20:
+            return "<20"
+        elif 20 <= data < 30:
+            return "20-30"
+        elif 30 <= data < 40:
+            return "30-40"
+        elif 40 <= data < 50:
+            return "40-50"
+        else:
+            return ">60"
+
+    cases = {
+        "essential": (lambda: origin["category"].apply(essential),
+                      lambda: essential_flag(origin["category"])),
+        "age_divide": (lambda: origin["age"].apply(lambda x: age_divide(x)),
+                       lambda: age_group(origin["age"])),
+        "user mask": (lambda: origin["new_id"].apply(lambda x: x in users),
+                      lambda: user_mask(origin["new_id"], users)),
+        "year_month": (lambda: origin["datetime"].apply(lambda x: x.strftime("%y-%m")),
+                       lambda: year_month(origin["datetime"]))
+    }
+    print(f"{rows} rows")
+    for name, (row_wise, vectorised) in cases.items():
+        expected, slow = _timed(row_wise)
+        result, fast = _timed(vectorised)
+        assert (expected.astype(str) == result.astype(str)).all(), name
+        print(f"{name:12} apply {slow:8.3f}s  vectorised {fast:8.3f}s  {slow / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3000000)
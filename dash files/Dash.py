@@ -1,76 +1,126 @@
-import pandas as pd
-import numpy as np
+import json
+
 import plotly.express as px
 import plotly.graph_objects as go
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 
-import tab1
-import tab2
-import tab3
-import tab4
-import tab5
-
-# read in the data
-trans_clus = pd.read_csv("trans_clustered.csv")
-payments_clus = pd.read_csv("payments_clustered.csv")
-user_clus = pd.read_csv("pivot_user_info_clustered.csv")
-monthly_data = pd.read_csv("monthly_data.csv")
+import config
+from data_context import get_context, start_watcher
+from figure_cache import cached_figure
+from large_scatter import user_scatter
+from storage import get_storage
+from tab_layouts import TABS, tab_layout
+from user_figures import essential_spending_figure, monthly_spending_figure, ontime_figure
 
 # app
 app = dash.Dash("BancoPan Visualization", external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.config.suppress_callback_exceptions = True
-
-app.layout = html.Div([
-    html.H2("BancoPan Visualization"),
-    dcc.Tabs(id="tabs", value="tab1", children=[
-        dcc.Tab(label="Individual User Summary", value="tab1"),
-        dcc.Tab(label="What are our Macro Profiles?", value="tab2"),
-        dcc.Tab(label="Macro Profiles Summary Stats", value="tab3"),
-        dcc.Tab(label="Macro Profiles Spending Behavior", value="tab4"),
-        dcc.Tab(label="Demographics", value="tab5")
-    ]),
-    html.Div(id="content")
-])
-
+# WSGI entry point for gunicorn
+server = app.server
+
+# data of the clientside callbacks: the dropdown tables and the full date range of tab 4
+def controls_data():
+    data = get_context().profile_controls.store_data()
+    data["dates"] = list(get_storage().date_range())
+    return data
+
+
+# built on every page load, so a reloaded context reaches the store
+def serve_layout():
+    return html.Div([
+        html.H2("BancoPan Visualization"),
+        dcc.Store(id="controls_store", data=controls_data()),
+        dcc.Tabs(id="tabs", value="tab1", children=[
+            dcc.Tab(label="Individual User Summary", value="tab1"),
+            dcc.Tab(label="What are our Macro Profiles?", value="tab2"),
+            dcc.Tab(label="Macro Profiles Summary Stats", value="tab3"),
+            dcc.Tab(label="Macro Profiles Spending Behavior", value="tab4"),
+            dcc.Tab(label="Demographics", value="tab5")
+        ]),
+        # tabs already shown in this page; the first tab comes with the page
+        dcc.Store(id="loaded_tabs", data=["tab1"]),
+        # one pane per tab, filled on its first visit; switching tabs only changes which pane is shown
+        html.Div(id="content", children=[
+            html.Div(tab_layout("tab1") if tab == "tab1" else [], id=f"{tab}_pane",
+                     style={} if tab == "tab1" else {"display": "none"})
+            for tab in TABS
+        ])
+    ])
+
+
+app.layout = serve_layout
 
 # render tabs
-@app.callback(
-    Output("content", "children"),
+app.clientside_callback(
+    """
+    function(tab) {
+        return %s.map(function(pane) { return pane === tab ? {} : {display: "none"}; });
+    }
+    """ % json.dumps(TABS),
+    [Output(f"{tab}_pane", "style") for tab in TABS],
     Input("tabs", "value")
 )
-def render_content(tab):
-    if tab == "tab1":
-        return tab1.tab1_layout
-    elif tab == "tab2":
-        return tab2.tab2_layout
-    elif tab == "tab3":
-        return tab3.tab3_layout
-    elif tab == "tab4":
-        return tab4.tab4_layout
-    elif tab == "tab5":
-        return tab5.tab5_layout
+
+
+# remember a tab the first time it is selected; later visits do not reach the server
+app.clientside_callback(
+    """
+    function(tab, loaded) {
+        if (loaded.indexOf(tab) !== -1) {
+            return window.dash_clientside.no_update;
+        }
+        return loaded.concat([tab]);
+    }
+    """,
+    Output("loaded_tabs", "data"),
+    Input("tabs", "value"),
+    State("loaded_tabs", "data")
+)
+
+
+# one fill callback per pane, so loading another tab never replaces a pane's pending request
+# (the renderer drops a callback's earlier result when it is requested again); a pane is built
+# once its tab is in loaded_tabs, on any later change too if it is still empty
+def register_tab_pane(tab):
+    @app.callback(
+        Output(f"{tab}_pane", "children"),
+        Input("loaded_tabs", "data"),
+        State(f"{tab}_pane", "children"),
+        prevent_initial_call=True
+    )
+    def load_tab(loaded_tabs, children):
+        if tab not in loaded_tabs or children:
+            return dash.no_update
+        return tab_layout(tab)
+
+
+for pane_tab in TABS:
+    register_tab_pane(pane_tab)
 
 
 # Tab 1 callbacks
+# options of the user dropdown for what is typed into it
+@app.callback(
+    Output("user_dropdown", "options"),
+    Input("user_dropdown", "search_value"),
+    State("user_dropdown", "value"),
+    prevent_initial_call=True
+)
+def search_users(search_value, user_selected):
+    return get_context().user_search.options(search_value, selected=user_selected)
+
+
 # the payment on time pie chart
 @app.callback(
     Output("ontime_graph", "figure"),
     Input("user_dropdown", "value")
 )
 def graph_ontime_percentage(user_selected):
-    late_df = pd.pivot_table(payments_clus, values="Year-Month", index=["Internal_ID", "Latency"],
-                             aggfunc="count").reset_index()
-    filtered = late_df[late_df["Internal_ID"] == user_selected]
-
-    fig = px.pie(data_frame=filtered, names="Latency", values="Year-Month",
-                 title="User Payment History")
-    fig.update_traces(hovertemplate="Number of month: %{value}")
-
-    return fig
+    return ontime_figure(get_storage().user_table("latency", user_selected))
 
 
 # Monthly spending graph
@@ -79,14 +129,7 @@ def graph_ontime_percentage(user_selected):
     Input(component_id="user_dropdown", component_property="value")
 )
 def graph_monthly_spending(user_selected):
-    monthly_spending = trans_clus.groupby(["Internal_ID", "Year-Month"])["Value"].sum().reset_index()
-    trans_filtered = monthly_spending[monthly_spending["Internal_ID"] == user_selected]
-
-    fig = go.Figure(go.Scatter(x=trans_filtered["Year-Month"], y=trans_filtered["Value"],
-                               marker=dict(size=15), hovertemplate="Spending: $%{y} <extra></extra>"))
-    fig.update_layout(title="User Monthly Spending", xaxis_title="Year-Month",
-                      yaxis_title="Value")
-    return fig
+    return monthly_spending_figure(get_storage().user_table("monthly_spending", user_selected))
 
 
 # Essential/Non-essential spending
@@ -95,406 +138,195 @@ def graph_monthly_spending(user_selected):
     Input(component_id="user_dropdown", component_property="value")
 )
 def graph_essential_spending(user_selected):
-    essential_spending = pd.pivot_table(trans_clus, values="Value", index=["Internal_ID", "Year-Month"],
-                                        columns="Expense_Importance", aggfunc="sum").reset_index()
-    # fill NA values with 0, as it means no purchase
-    essential_spending = essential_spending.fillna(0)
-    filtered = essential_spending[essential_spending["Internal_ID"] == user_selected]
-
-    trace1 = go.Scatter(x=filtered["Year-Month"], y=filtered["Essential"], name="Essential", mode="markers",
-                        marker=dict(color="rgb(0,0,230)", size=17), hovertemplate="$%{y}")
-    trace2 = go.Scatter(x=filtered["Year-Month"], y=filtered["Non-Essential"], name="Non-Essential", mode="markers",
-                        marker=dict(color="rgb(230,0,0)", size=17), hovertemplate="$%{y}")
-    fig = go.Figure()
-    fig.add_trace(trace1)
-    fig.add_trace(trace2)
-    fig.update_layout(title="User Monthly Essential and Non-Essential Spending",
-                      xaxis_title="Year-Month", yaxis_title="Value", width=1300)
-
-    return fig
+    return essential_spending_figure(get_storage().user_table("essential_spending", user_selected))
+
+
+# profile/financial health dropdowns, shared by tab 3, tab 4 and tab 5
+# they only read the controls store, so they run in the browser
+def register_profile_controls(prefix):
+    # Callback to generate the second dropdown based on the first dropdown
+    app.clientside_callback(
+        """
+        function(profile, store) {
+            return store.options[profile] || store.default_options;
+        }
+        """,
+        Output(component_id=f"{prefix}_financial_health", component_property="options"),
+        Input(component_id=f"{prefix}_profile", component_property="value"),
+        State(component_id="controls_store", component_property="data")
+    )
+
+    # Reset the second dropdown whether the user changes the first
+    app.clientside_callback(
+        """
+        function(profile) {
+            return "All";
+        }
+        """,
+        Output(component_id=f"{prefix}_financial_health", component_property="value"),
+        Input(component_id=f"{prefix}_profile", component_property="value")
+    )
+
+    # Print how many users are selected
+    app.clientside_callback(
+        """
+        function(profile, health, store) {
+            var num;
+            if (profile === null || profile === undefined) {
+                num = store.total;
+            } else if (health === null || health === undefined || health === "All") {
+                num = store.cluster_counts[profile] || 0;
+            } else {
+                num = (store.counts[profile] || {})[health] || 0;
+            }
+            return "Number of users selected: " + num;
+        }
+        """,
+        Output(component_id=f"{prefix}_num_users", component_property="children"),
+        [Input(component_id=f"{prefix}_profile", component_property="value"),
+         Input(component_id=f"{prefix}_financial_health", component_property="value")],
+        State(component_id="controls_store", component_property="data")
+    )
+
+
+for tab_prefix in ["tab3", "tab4", "tab5"]:
+    register_profile_controls(tab_prefix)
 
 
 # Tab 3 callbacks
-# all options for financial health
-health_dic = {"high": "High Financial Health", "medium": "Medium Financial Health",
-              "low": "Low Financial Health"}
-
-
-# Callback to generate the second dropdown based on the first dropdown
-@app.callback(
-    Output(component_id="tab3_financial_health", component_property="options"),
-    Input(component_id="tab3_profile", component_property="value")
-)
-def return_selection(user_selected):
-    filtered = user_clus[user_clus["Cluster"] == user_selected]
-    unique_keys = filtered["overall_health"].unique()
-    if len(unique_keys) == 1:
-        options = [{"label": "All Users", "value": "All"}]
-    else:
-        options = [{"label": health_dic[unique_key], "value": unique_key} for unique_key in unique_keys]
-        options.append({"label": "All Users", "value": "All"})
-    return options
-
-
-# Reset the second dropdown whether the user changes the first
-@app.callback(
-    Output(component_id="tab3_financial_health", component_property="value"),
-    Input(component_id="tab3_profile", component_property="value")
-)
-def reset(user_selected):
-    return "All"
-
-
-# Print how many users are selected
-@app.callback(
-    Output(component_id="tab3_num_users", component_property="children"),
-    [Input(component_id="tab3_profile", component_property="value"),
-     Input(component_id="tab3_financial_health", component_property="value")]
-)
-def print_num_users(profile, financial_health):
-    if profile is None:
-        num = user_clus.shape[0]
-    else:
-        if financial_health is None or financial_health == "All":
-            filtered1 = user_clus[user_clus["Cluster"] == profile]
-            num = filtered1.shape[0]
-        else:
-            filtered1 = user_clus[user_clus["Cluster"] == profile]
-            filtered2 = filtered1[filtered1["overall_health"] == financial_health]
-            num = filtered2.shape[0]
-    return f"Number of users selected: {num}"
-
-
-@app.callback(
-    Output(component_id="tab3_spending", component_property="figure"),
-    [
-        Input(component_id="tab3_profile", component_property="value"),
-        Input(component_id="tab3_financial_health", component_property="value"),
-        Input(component_id="tab3_checkbox", component_property="value")
-    ]
-)
-def spending_graph(profile, financial_health, checkbox):
-    pop_average = (monthly_data.groupby("Year-Month")["Spending"].sum() /
-                   monthly_data.groupby("Year-Month")["Spending"].count()).reset_index()
-    fig = go.Figure()
-    trace1 = go.Scatter(x=pop_average["Year-Month"], y=pop_average["Spending"], name="All users",
-                        marker=dict(color="rgb(96,96,96)", size=10), hovertemplate="Spending: $%{y: .0f}")
-    fig.add_trace(trace1)
-    if profile is not None:
-        profile_filtered = monthly_data[monthly_data["Cluster"] == profile]
-        group_average = (profile_filtered.groupby("Year-Month")["Spending"].sum() /
-                         profile_filtered.groupby("Year-Month")["Spending"].count()).reset_index()
-        trace2 = go.Scatter(x=group_average["Year-Month"], y=group_average["Spending"],
-                            name=f"All {profile} users",
-                            marker=dict(color="rgb(0,0,210)", size=10), hovertemplate="Spending: $%{y: .0f}")
-        if financial_health == "All":
-            fig.add_trace(trace2)
-
-        else:
-            final_filtered = profile_filtered[profile_filtered["overall_health"] == financial_health]
-            final_average = (final_filtered.groupby("Year-Month")["Spending"].sum() /
-                             final_filtered.groupby("Year-Month")["Spending"].count()).reset_index()
-            trace3 = go.Scatter(x=final_average["Year-Month"], y=final_average["Spending"],
-                                name=f"All {financial_health} financial health users in {profile}",
-                                marker=dict(color="rgb(102,204,0)", size=10), hovertemplate="Spending: $%{y: .0f}")
-            if not checkbox:
-                fig.add_trace(trace3)
-                fig.add_trace(trace2)
-            else:
-                health_filtered = monthly_data[monthly_data["overall_health"] == financial_health]
-                health_average = (health_filtered.groupby("Year-Month")["Spending"].sum() /
-                                  health_filtered.groupby("Year-Month")["Spending"].count()).reset_index()
-                trace4 = go.Scatter(x=health_average["Year-Month"], y=health_average["Spending"],
-                                    name=f"All {financial_health} financial health users",
-                                    marker=dict(color="rgb(255,128,0)", size=10), hovertemplate="Spending: $%{y: .0f}")
-                fig.add_trace(trace3)
-                fig.add_trace(trace2)
-                fig.add_trace(trace4)
-
-    fig.update_layout(title="Average Monthly Spending Per User", xaxis_title="Month", yaxis_title="Spending")
-    return fig
-
-
-@app.callback(
-    Output(component_id="tab3_spending vs limit", component_property="figure"),
-    [
-        Input(component_id="tab3_profile", component_property="value"),
-        Input(component_id="tab3_financial_health", component_property="value"),
-        Input(component_id="tab3_checkbox", component_property="value")
-    ]
-)
-def spending_limit_graph(profile, financial_health, checkbox):
-    pop_average = monthly_data.groupby("Year-Month")["Spending to Limit"].mean().reset_index()
+# monthly average graphs of tab 3 and tab 4: output id -> the metric and its labels
+# a new graph only needs an entry here, with its metric in monthly_cube.CUBE_METRICS
+AVERAGE_GRAPHS = {
+    "tab3_spending": dict(metric="Spending", hovertemplate="Spending: $%{y: .0f}",
+                          title="Average Monthly Spending Per User", yaxis_title="Spending"),
+    "tab3_spending vs limit": dict(metric="Spending to Limit", hovertemplate="Spending/Total Limit:%{y: .2f}",
+                                   title="Average Spending/Total Limit Per User", yaxis_title="Percentage"),
+    "tab4_NonEssential": dict(metric="NonEssential_Percentage", hovertemplate="Non-Essential Spending:%{y: .2f}",
+                              title="Average Percentage Spending of Non-Essential Goods Per User",
+                              yaxis_title="Percentage")
+}
+
+
+def group_average_figure(metric, profile, financial_health, checkbox, hovertemplate, title, yaxis_title):
+    storage = get_storage()
+    pop_average = storage.average_series(metric)
     fig = go.Figure()
-    trace1 = go.Scatter(x=pop_average["Year-Month"], y=pop_average["Spending to Limit"], name="All users",
-                        marker=dict(color="rgb(96,96,96)", size=10), hovertemplate="Spending/Total Limit:%{y: .2f}")
+    trace1 = go.Scatter(x=pop_average["Year-Month"], y=pop_average[metric], name="All users",
+                        marker=dict(color="rgb(96,96,96)", size=10), hovertemplate=hovertemplate)
     fig.add_trace(trace1)
     if profile is not None:
-        profile_filtered = monthly_data[monthly_data["Cluster"] == profile]
-        group_average = profile_filtered.groupby("Year-Month")["Spending to Limit"].mean().reset_index()
-        trace2 = go.Scatter(x=group_average["Year-Month"], y=group_average["Spending to Limit"],
+        group_average = storage.average_series(metric, Cluster=profile)
+        trace2 = go.Scatter(x=group_average["Year-Month"], y=group_average[metric],
                             name=f"All {profile} users",
-                            marker=dict(color="rgb(0,0,210)", size=10), hovertemplate="Spending/Total Limit:%{y: .2f}")
+                            marker=dict(color="rgb(0,0,210)", size=10), hovertemplate=hovertemplate)
         if financial_health == "All":
             fig.add_trace(trace2)
 
         else:
-            final_filtered = profile_filtered[profile_filtered["overall_health"] == financial_health]
-            final_average = final_filtered.groupby("Year-Month")["Spending to Limit"].mean().reset_index()
-            trace3 = go.Scatter(x=final_average["Year-Month"], y=final_average["Spending to Limit"],
+            final_average = storage.average_series(metric, Cluster=profile, overall_health=financial_health)
+            trace3 = go.Scatter(x=final_average["Year-Month"], y=final_average[metric],
                                 name=f"All {financial_health} financial health users in {profile}",
-                                marker=dict(color="rgb(102,204,0)", size=10),
-                                hovertemplate="Spending/Total Limit:%{y: .2f}")
+                                marker=dict(color="rgb(102,204,0)", size=10), hovertemplate=hovertemplate)
             if not checkbox:
                 fig.add_trace(trace3)
                 fig.add_trace(trace2)
             else:
-                health_filtered = monthly_data[monthly_data["overall_health"] == financial_health]
-                health_average = health_filtered.groupby("Year-Month")["Spending to Limit"].mean().reset_index()
-                trace4 = go.Scatter(x=health_average["Year-Month"], y=health_average["Spending to Limit"],
+                health_average = storage.average_series(metric, overall_health=financial_health)
+                trace4 = go.Scatter(x=health_average["Year-Month"], y=health_average[metric],
                                     name=f"All {financial_health} financial health users",
-                                    marker=dict(color="rgb(255,128,0)", size=10),
-                                    hovertemplate="Spending/Total Limit:%{y: .2f}")
+                                    marker=dict(color="rgb(255,128,0)", size=10), hovertemplate=hovertemplate)
                 fig.add_trace(trace3)
                 fig.add_trace(trace2)
                 fig.add_trace(trace4)
 
-    fig.update_layout(title="Average Spending/Total Limit Per User", xaxis_title="Month", yaxis_title="Percentage")
+    fig.update_layout(title=title, xaxis_title="Month", yaxis_title=yaxis_title)
     return fig
 
 
-# callbacks for tab 4
-# Callback to generate the second dropdown based on the first dropdown
-@app.callback(
-    Output(component_id="tab4_financial_health", component_property="options"),
-    Input(component_id="tab4_profile", component_property="value")
-)
-def return_selection(user_selected):
-    filtered = user_clus[user_clus["Cluster"] == user_selected]
-    unique_keys = filtered["overall_health"].unique()
-    if len(unique_keys) == 1:
-        options = [{"label": "All Users", "value": "All"}]
-    else:
-        options = [{"label": health_dic[unique_key], "value": unique_key} for unique_key in unique_keys]
-        options.append({"label": "All Users", "value": "All"})
-    return options
-
-
-# Reset the second dropdown whether the user changes the first
-@app.callback(
-    Output(component_id="tab4_financial_health", component_property="value"),
-    Input(component_id="tab4_profile", component_property="value")
-)
-def reset(user_selected):
-    return "All"
-
+def register_average_graph(output_id, **graph):
+    prefix = output_id.split("_")[0]
 
-# Print how many users are selected
-@app.callback(
-    Output(component_id="tab4_num_users", component_property="children"),
-    [Input(component_id="tab4_profile", component_property="value"),
-     Input(component_id="tab4_financial_health", component_property="value")]
-)
-def print_num_users(profile, financial_health):
-    if profile is None:
-        num = user_clus.shape[0]
-    else:
-        if financial_health is None or financial_health == "All":
-            filtered1 = user_clus[user_clus["Cluster"] == profile]
-            num = filtered1.shape[0]
-        else:
-            filtered1 = user_clus[user_clus["Cluster"] == profile]
-            filtered2 = filtered1[filtered1["overall_health"] == financial_health]
-            num = filtered2.shape[0]
-    return f"Number of users selected: {num}"
-
-
-# generate the nonessential plot
-@app.callback(
-    Output(component_id="tab4_NonEssential", component_property="figure"),
-    [
-        Input(component_id="tab4_profile", component_property="value"),
-        Input(component_id="tab4_financial_health", component_property="value"),
-        Input(component_id="tab4_checkbox", component_property="value")
-    ]
-)
-def nonessential_graph(profile, financial_health, checkbox):
-    pop_average = monthly_data.groupby("Year-Month")["NonEssential_Percentage"].mean().reset_index()
-    fig = go.Figure()
-    trace1 = go.Scatter(x=pop_average["Year-Month"], y=pop_average["NonEssential_Percentage"], name="All users",
-                        marker=dict(color="rgb(96,96,96)", size=10),
-                        hovertemplate="Non-Essential Spending:%{y: .2f}")
-    fig.add_trace(trace1)
-    if profile is not None:
-        profile_filtered = monthly_data[monthly_data["Cluster"] == profile]
-        group_average = profile_filtered.groupby("Year-Month")["NonEssential_Percentage"].mean().reset_index()
-        trace2 = go.Scatter(x=group_average["Year-Month"], y=group_average["NonEssential_Percentage"],
-                            name=f"All {profile} users",
-                            marker=dict(color="rgb(0,0,210)", size=10),
-                            hovertemplate="Non-Essential Spending:%{y: .2f}")
-        if financial_health == "All":
-            fig.add_trace(trace2)
+    @app.callback(
+        Output(component_id=output_id, component_property="figure"),
+        [
+            Input(component_id=f"{prefix}_profile", component_property="value"),
+            Input(component_id=f"{prefix}_financial_health", component_property="value"),
+            Input(component_id=f"{prefix}_checkbox", component_property="value")
+        ]
+    )
+    @cached_figure
+    def average_graph(profile, financial_health, checkbox):
+        return group_average_figure(profile=profile, financial_health=financial_health, checkbox=checkbox, **graph)
 
-        else:
-            final_filtered = profile_filtered[profile_filtered["overall_health"] == financial_health]
-            final_average = final_filtered.groupby("Year-Month")["NonEssential_Percentage"].mean().reset_index()
-            trace3 = go.Scatter(x=final_average["Year-Month"], y=final_average["NonEssential_Percentage"],
-                                name=f"All {financial_health} financial health users in {profile}",
-                                marker=dict(color="rgb(102,204,0)", size=10),
-                                hovertemplate="Non-Essential Spending:%{y: .2f}")
-            if not checkbox:
-                fig.add_trace(trace3)
-                fig.add_trace(trace2)
-            else:
-                health_filtered = monthly_data[monthly_data["overall_health"] == financial_health]
-                health_average = health_filtered.groupby("Year-Month")["NonEssential_Percentage"].mean().reset_index()
-                trace4 = go.Scatter(x=health_average["Year-Month"], y=health_average["NonEssential_Percentage"],
-                                    name=f"All {financial_health} financial health users",
-                                    marker=dict(color="rgb(255,128,0)", size=10),
-                                    hovertemplate="Non-Essential Spending:%{y: .2f}")
-                fig.add_trace(trace3)
-                fig.add_trace(trace2)
-                fig.add_trace(trace4)
 
-    fig.update_layout(title="Average Percentage Spending of Non-Essential Goods Per User", xaxis_title="Month",
-                      yaxis_title="Percentage")
-    return fig
+for graph_id, graph_spec in AVERAGE_GRAPHS.items():
+    register_average_graph(graph_id, **graph_spec)
 
 
+# callbacks for tab 4
 # reset date_picker
-@app.callback(
+app.clientside_callback(
+    """
+    function(reset, store) {
+        return store.dates;
+    }
+    """,
     [Output(component_id="tab4_date_picker", component_property="start_date"),
      Output(component_id="tab4_date_picker", component_property="end_date")],
-    Input(component_id="tab4_button", component_property="n_clicks")
-)
-def reset_date(reset):
-    return trans_clus["Fixed_Date"].min(), trans_clus["Fixed_Date"].max()
-
-
-# generate the first pie chart
-@app.callback(
-    Output(component_id="tab4_pop_Cate", component_property="figure"),
-    [Input(component_id="tab4_date_picker", component_property="start_date"),
-     Input(component_id="tab4_date_picker", component_property="end_date")]
+    Input(component_id="tab4_button", component_property="n_clicks"),
+    State(component_id="controls_store", component_property="data")
 )
-def first_pie(start_date, end_date):
-    dates_filtered = trans_clus[trans_clus["Fixed_Date"].between(start_date, end_date)]
-    cate_summary = (dates_filtered.groupby("Grupo_Estabelecimento")["Value"].sum() / dates_filtered["Value"].sum()) \
-        .reset_index().sort_values("Value", ascending=False).reset_index()
-    cate_summary.loc[5:, "Grupo_Estabelecimento"] = "Others"
-    fig = px.pie(cate_summary, names="Grupo_Estabelecimento", values="Value")
-    fig.update_traces(textposition='inside', textinfo='percent+label', showlegend=False,
-                      title_text="Category Breakdown for All Users", title_font_size=60, hovertemplate=None,
-                      hoverinfo='skip')
-    return fig
 
 
-# generate the second pie chart
-@app.callback(
-    Output(component_id="tab4_group_Cate", component_property="figure"),
-    [Input(component_id="tab4_date_picker", component_property="start_date"),
-     Input(component_id="tab4_date_picker", component_property="end_date"),
-     Input(component_id="tab4_profile", component_property="value")]
-)
-def second_pie(start_date, end_date, profile):
-    if profile is None:
-        dates_filtered = trans_clus[trans_clus["Fixed_Date"].between(start_date, end_date)]
-    else:
-        group_filtered = trans_clus[trans_clus["Cluster"] == profile]
-        dates_filtered = group_filtered[group_filtered["Fixed_Date"].between(start_date, end_date)]
-    cate_summary = (dates_filtered.groupby("Grupo_Estabelecimento")["Value"].sum() / dates_filtered["Value"].sum()) \
-        .reset_index().sort_values("Value", ascending=False).reset_index()
+# share of each category in a breakdown, with everything after the top 5 folded into "Others"
+def category_pie(breakdown, title_text):
+    totals, total = breakdown
+    cate_summary = (totals / total).reset_index().sort_values("Value", ascending=False).reset_index()
     cate_summary.loc[5:, "Grupo_Estabelecimento"] = "Others"
     fig = px.pie(cate_summary, names="Grupo_Estabelecimento", values="Value")
     fig.update_traces(textposition='inside', textinfo='percent+label', showlegend=False,
-                      title_text=f"Category Breakdown for all users in {profile}", title_font_size=60,
-                      hovertemplate=None, hoverinfo='skip'
-                      )
+                      title_text=title_text, title_font_size=60, hovertemplate=None, hoverinfo='skip')
     return fig
 
 
-# generate the third pie chart
+# generate the three pie charts from one range_totals query of the storage:
+# all users, the selected profile, and the selected profile and financial health
 @app.callback(
-    Output(component_id="tab4_health_Cate", component_property="figure"),
+    [Output(component_id="tab4_pop_Cate", component_property="figure"),
+     Output(component_id="tab4_group_Cate", component_property="figure"),
+     Output(component_id="tab4_health_Cate", component_property="figure")],
     [Input(component_id="tab4_date_picker", component_property="start_date"),
      Input(component_id="tab4_date_picker", component_property="end_date"),
      Input(component_id="tab4_profile", component_property="value"),
      Input(component_id="tab4_financial_health", component_property="value")]
 )
-def third_pie(start_date, end_date, profile, financial_health):
-    if profile is None:
-        dates_filtered = trans_clus[trans_clus["Fixed_Date"].between(start_date, end_date)]
-    else:
-        if financial_health == "All" or financial_health is None:
-            group_filtered = trans_clus[trans_clus["Cluster"] == profile]
-            dates_filtered = group_filtered[group_filtered["Fixed_Date"].between(start_date, end_date)]
-        else:
-            group_filtered = trans_clus[trans_clus["Cluster"] == profile]
-            health_filtered = group_filtered[group_filtered["overall_health"] == financial_health]
-            dates_filtered = health_filtered[health_filtered["Fixed_Date"].between(start_date, end_date)]
-    cate_summary = (dates_filtered.groupby("Grupo_Estabelecimento")["Value"].sum() / dates_filtered["Value"].sum()) \
-        .reset_index().sort_values("Value", ascending=False).reset_index()
-    cate_summary.loc[5:, "Grupo_Estabelecimento"] = "Others"
-    fig = px.pie(cate_summary, names="Grupo_Estabelecimento", values="Value")
-    fig.update_traces(textposition='inside', textinfo='percent+label', showlegend=False,
-                      title_text=f"Category Breakdown for {financial_health} financial health users in {profile}",
-                      title_font_size=60, hovertemplate=None, hoverinfo='skip')
-    return fig
-
-
-# tab 5 callbacks
-# Callback to generate the second dropdown based on the first dropdown
-@app.callback(
-    Output(component_id="tab5_financial_health", component_property="options"),
-    Input(component_id="tab5_profile", component_property="value")
-)
-def return_selection(user_selected):
-    filtered = user_clus[user_clus["Cluster"] == user_selected]
-    unique_keys = filtered["overall_health"].unique()
-    if len(unique_keys) == 1:
-        options = [{"label": "All Users", "value": "All"}]
+@cached_figure
+def category_pies(start_date, end_date, profile, financial_health):
+    storage = get_storage()
+    in_range = storage.range_totals(start_date, end_date)
+
+    population = storage.breakdown(in_range)
+    group = population if profile is None else storage.breakdown(in_range, Cluster=profile)
+    if profile is None or financial_health == "All" or financial_health is None:
+        health = group
     else:
-        options = [{"label": health_dic[unique_key], "value": unique_key} for unique_key in unique_keys]
-        options.append({"label": "All Users", "value": "All"})
-    return options
-
+        health = storage.breakdown(in_range, Cluster=profile, overall_health=financial_health)
 
-# Reset the second dropdown whether the user changes the first
-@app.callback(
-    Output(component_id="tab5_financial_health", component_property="value"),
-    Input(component_id="tab5_profile", component_property="value")
-)
-def reset(user_selected):
-    return "All"
-
-
-# show how many users are selected
-@app.callback(
-    Output(component_id="tab5_num_users", component_property="children"),
-    [Input(component_id="tab5_profile", component_property="value"),
-     Input(component_id="tab5_financial_health", component_property="value")]
-)
-def print_num_users(profile, financial_health):
-    if profile is None:
-        num = user_clus.shape[0]
-    else:
-        if financial_health is None or financial_health == "All":
-            filtered1 = user_clus[user_clus["Cluster"] == profile]
-            num = filtered1.shape[0]
-        else:
-            filtered1 = user_clus[user_clus["Cluster"] == profile]
-            filtered2 = filtered1[filtered1["overall_health"] == financial_health]
-            num = filtered2.shape[0]
-    return f"Number of users selected: {num}"
+    return (category_pie(population, "Category Breakdown for All Users"),
+            category_pie(group, f"Category Breakdown for all users in {profile}"),
+            category_pie(health, f"Category Breakdown for {financial_health} financial health users in {profile}"))
 
 
+# tab 5 callbacks
 # pie chart for gender
 @app.callback(
     Output(component_id="gender_pie", component_property="figure"),
     [Input(component_id="tab5_profile", component_property="value"),
      Input(component_id="tab5_financial_health", component_property="value")]
 )
+@cached_figure
 def gender_pie(profile, health):
+    user_clus = get_context().user_clus
     if profile is None:
         filtered = user_clus
     else:
@@ -503,7 +335,7 @@ def gender_pie(profile, health):
         else:
             filtered1 = user_clus[user_clus["Cluster"] == profile]
             filtered = filtered1[filtered1["overall_health"] == health]
-    filtered_pie = filtered.groupby("Sexo")["Internal_ID"].count().reset_index()
+    filtered_pie = filtered.groupby("Sexo", observed=True)["Internal_ID"].count().reset_index()
     fig = px.pie(filtered_pie, names="Sexo", values="Internal_ID")
     fig.update_traces(textposition='inside', textinfo='percent+label', showlegend=False,
                       title_text="Gender Breakdown",
@@ -517,8 +349,9 @@ def gender_pie(profile, health):
     [Input(component_id="tab5_profile", component_property="value"),
      Input(component_id="tab5_financial_health", component_property="value")]
 )
+@cached_figure
 def geo_pie(profile, health):
-    user_clus["location"] = np.where(user_clus["Cidade"] == "SAO PAULO", "In SAO PAULO", "Outside SAO PAULO")
+    user_clus = get_context().user_clus
     if profile is None:
         filtered = user_clus
     else:
@@ -527,7 +360,7 @@ def geo_pie(profile, health):
         else:
             filtered1 = user_clus[user_clus["Cluster"] == profile]
             filtered = filtered1[filtered1["overall_health"] == health]
-    filtered_pie = filtered.groupby("location")["Internal_ID"].count().reset_index()
+    filtered_pie = filtered.groupby("location", observed=True)["Internal_ID"].count().reset_index()
     fig = px.pie(filtered_pie, names="location", values="Internal_ID")
     fig.update_traces(textposition='inside', textinfo='percent+label', showlegend=False,
                       title_text="Location Breakdown",
@@ -541,8 +374,9 @@ def geo_pie(profile, health):
     [Input(component_id="tab5_profile", component_property="value"),
      Input(component_id="tab5_financial_health", component_property="value")]
 )
+@cached_figure
 def age_scatter(profile, health):
-    user_clus["location"] = np.where(user_clus["Cidade"] == "SAO PAULO", "In SAO PAULO", "Outside SAO PAULO")
+    user_clus = get_context().user_clus
     if profile is None:
         filtered = user_clus
     else:
@@ -551,10 +385,12 @@ def age_scatter(profile, health):
         else:
             filtered1 = user_clus[user_clus["Cluster"] == profile]
             filtered = filtered1[filtered1["overall_health"] == health]
-    fig = px.scatter(filtered, x="Idade", y="Monthly_Spending", color="Sexo", title="Age Analysis")
-    fig.update_traces(marker=dict(size=15))
+    fig = user_scatter(filtered, x="Idade", y="Monthly_Spending", color="Sexo", title="Age Analysis")
     fig.update_xaxes(range=[18, 48])
     return fig
 
 
-app.run_server(debug=True)
+if __name__ == "__main__":
+    if config.RELOAD_INTERVAL > 0:
+        start_watcher(config.RELOAD_INTERVAL)
+    app.run_server(host=config.HOST, port=config.PORT, debug=config.DEBUG)
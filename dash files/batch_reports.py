@@ -0,0 +1,133 @@
+import argparse
+import json
+import multiprocessing
+import os
+
+import plotly
+
+from data_context import get_context
+from storage import get_storage
+from user_figures import USER_FIGURES, user_figures
+
+# headless Tab 1 reports for every user: the same figures as the dashboard, written as files
+# users are split into shards and rendered by a process pool; a user whose report is already
+# on disk is skipped, so a failed or interrupted run is resumed by running it again
+
+FORMATS = ["html", "json", "png"]
+
+try:
+    import kaleido  # noqa: F401  (needed by plotly to write png)
+    HAS_KALEIDO = True
+except ImportError:
+    HAS_KALEIDO = False
+
+
+def report_path(out_dir, user, extension):
+    return os.path.join(out_dir, f"user_{user}.{extension}")
+
+
+# html and json hold every figure of the user, png is one image per figure
+def report_files(out_dir, user, formats):
+    paths = []
+    for extension in formats:
+        if extension == "png":
+            paths += [report_path(out_dir, user, f"{name}.png") for name in USER_FIGURES]
+        else:
+            paths.append(report_path(out_dir, user, extension))
+    return paths
+
+
+# write through a temporary file so an interrupted run never leaves half a report behind
+def _write(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_text(path, text):
+    def write(tmp_path):
+        with open(tmp_path, "w") as file:
+            file.write(text)
+    _write(path, write)
+
+
+# each file is written whole or not at all, so the report is complete once they all exist
+def is_done(out_dir, user, formats):
+    return all(os.path.exists(path) for path in report_files(out_dir, user, formats))
+
+
+def write_report(out_dir, user, formats):
+    figures = user_figures(get_storage(), user)
+    if "html" in formats:
+        # plotly.js is loaded once per page, from the CDN
+        body = "\n".join(fig.to_html(full_html=False, include_plotlyjs="cdn" if number == 0 else False)
+                         for number, fig in enumerate(figures.values()))
+        _write_text(report_path(out_dir, user, "html"),
+                    f"<html><head><meta charset=\"utf-8\"><title>User {user}</title></head>"
+                    f"<body><h2>User {user}</h2>\n{body}\n</body></html>")
+    if "png" in formats:
+        for name, fig in figures.items():
+            _write(report_path(out_dir, user, f"{name}.png"),
+                   lambda tmp_path: fig.write_image(tmp_path, format="png"))
+    if "json" in formats:
+        _write_text(report_path(out_dir, user, "json"),
+                    json.dumps({name: fig.to_dict() for name, fig in figures.items()},
+                               cls=plotly.utils.PlotlyJSONEncoder))
+
+
+# render one shard of users; a failing user is reported and the rest of the shard carries on
+def render_shard(task):
+    out_dir, users, formats = task
+    done, failed = [], []
+    for user in users:
+        try:
+            write_report(out_dir, user, formats)
+            done.append(user)
+        except Exception as error:
+            failed.append((user, f"{type(error).__name__}: {error}"))
+    return done, failed
+
+
+def shards(users, shard_size):
+    return [users[start:start + shard_size] for start in range(0, len(users), shard_size)]
+
+
+def run(out_dir="reports", users=None, formats=("html", "json"), workers=None, shard_size=50, force=False):
+    formats = [extension for extension in FORMATS if extension in formats]
+    if "png" in formats and not HAS_KALEIDO:
+        raise RuntimeError("png reports need the kaleido package")
+    os.makedirs(out_dir, exist_ok=True)
+
+    # load the data before the pool starts, so forked workers share it instead of loading it again
+    context = get_context()
+    known = set(context.user_clus["Internal_ID"].tolist())
+    if users is None:
+        users = context.user_clus["Internal_ID"].tolist()
+    unknown = [(user, "unknown Internal_ID") for user in users if user not in known]
+    todo = [user for user in users if user in known and (force or not is_done(out_dir, user, formats))]
+    tasks = [(out_dir, shard, formats) for shard in shards(todo, shard_size)]
+
+    done, failed = [], list(unknown)
+    with multiprocessing.Pool(workers) as pool:
+        for shard_done, shard_failed in pool.imap_unordered(render_shard, tasks):
+            done += shard_done
+            failed += shard_failed
+    return len(users) - len(todo) - len(unknown), done, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the Tab 1 report of every user")
+    parser.add_argument("--out", default="reports", help="folder of the reports")
+    parser.add_argument("--users", type=int, nargs="*", help="Internal_IDs to render (default: all users)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["html", "json"], dest="formats")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=50, help="users per task sent to a worker")
+    parser.add_argument("--force", action="store_true", help="render users whose report already exists")
+    args = parser.parse_args()
+
+    skipped, done, failed = run(args.out, args.users, args.formats, args.workers, args.shard_size, args.force)
+    print(f"{len(done)} reports written to {args.out}, {skipped} already there, {len(failed)} failed")
+    for user, error in failed:
+        print(f"user {user}: {error}")
+    if failed:
+        raise SystemExit(1)
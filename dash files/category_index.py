@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from star_schema import with_user_columns
+
+GROUPS = ["Cluster", "overall_health"]
+
+
+# running totals of spending per day for every (Cluster, overall_health, Grupo_Estabelecimento)
+# the totals of any date range are the difference of two rows, so a date-picker change costs
+# O(categories) whatever the number of transactions
+class CategoryIndex:
+    def __init__(self, trans_clus, user_clus):
+        rows = with_user_columns(trans_clus[["Internal_ID", "Fixed_Date", "Grupo_Estabelecimento", "Value"]],
+                                 user_clus, GROUPS)
+        # keep rows without a category: they count towards the range total, like in the unindexed pies
+        daily = rows.groupby(["Fixed_Date"] + GROUPS + ["Grupo_Estabelecimento"], observed=True,
+                             dropna=False)["Value"].agg(["sum", "size"])
+        sums = daily["sum"].unstack(GROUPS + ["Grupo_Estabelecimento"], fill_value=0).sort_index()
+        sizes = daily["size"].unstack(GROUPS + ["Grupo_Estabelecimento"], fill_value=0).reindex_like(sums)
+
+        # Fixed_Date is an ISO string, so sorted strings give the same ranges as Series.between
+        self.dates = sums.index.to_numpy()
+        self.columns = sums.columns
+        zero = np.zeros((1, len(self.columns)))
+        self.cum_sums = np.vstack([zero, sums.to_numpy().cumsum(axis=0)])
+        self.cum_sizes = np.vstack([zero, sizes.to_numpy().cumsum(axis=0)])
+
+    # spending and number of rows per column between the two dates (inclusive);
+    # one slice serves every breakdown of the same range
+    def range_totals(self, start_date, end_date):
+        first = np.searchsorted(self.dates, start_date, side="left")
+        last = max(first, np.searchsorted(self.dates, end_date, side="right"))
+        return self.cum_sums[last] - self.cum_sums[first], self.cum_sizes[last] - self.cum_sizes[first]
+
+    # spending per category for the users matching the groups, plus their total spending,
+    # from a range_totals slice, e.g. breakdown(in_range, Cluster="Group 1")
+    def breakdown(self, range_totals, **groups):
+        sums, sizes = range_totals
+        mask = np.ones(len(self.columns), dtype=bool)
+        for name, value in groups.items():
+            mask &= self.columns.get_level_values(name) == value
+        present = mask & (sizes > 0)
+        categories = self.columns.get_level_values("Grupo_Estabelecimento")[present].to_numpy()
+        totals = pd.Series(sums[present], name="Value").groupby(categories).sum()
+        totals.index.name = "Grupo_Estabelecimento"
+        return totals, sums[mask].sum()
+
+    def memory_usage(self):
+        return self.cum_sums.nbytes + self.cum_sizes.nbytes
@@ -0,0 +1,181 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.cluster.hierarchy import fcluster, linkage
+    from scipy.spatial.distance import squareform
+except ImportError:
+    linkage = None
+
+# the macro profiles of tab 2: hierarchical clustering (average linkage) of the users
+# on a weighted Gower distance
+# the distances are computed in blocks, so no n x n matrix is ever held: the linkage runs on
+# a sample of users and everyone else joins the cluster at the smallest average distance
+
+# user columns and their weight in the distance; numeric columns are scaled by their range,
+# any other column counts as a category (0 when equal, 1 otherwise)
+FEATURE_WEIGHTS = {"Monthly_Spending": 1.0, "Monthly_Transactions": 1.0, "Limite_Total": 1.0,
+                   "NonEssential_Percentage": 1.0, "Idade": 1.0, "Sexo": 1.0}
+
+# users in the linkage; above this the rest are assigned to the clusters found on the sample
+SAMPLE_SIZE = 2000
+# rows per block of distances, so a block holds BLOCK_SIZE x SAMPLE_SIZE floats
+BLOCK_SIZE = 1000
+
+
+# the columns as arrays ready for the distance: numeric ones divided by their range,
+# categories as integer codes (-1 when missing)
+class GowerFeatures:
+    def __init__(self, frame, weights=FEATURE_WEIGHTS):
+        numeric, numeric_weights, codes, code_weights = [], [], [], []
+        for column, weight in weights.items():
+            values = frame[column]
+            if pd.api.types.is_numeric_dtype(values):
+                values = values.to_numpy(dtype=float)
+                value_range = np.nanmax(values) - np.nanmin(values)
+                numeric.append(values / (value_range or 1.0))
+                numeric_weights.append(weight)
+            else:
+                codes.append(pd.factorize(values)[0])
+                code_weights.append(weight)
+        self.numeric = np.column_stack(numeric) if numeric else np.empty((len(frame), 0))
+        self.numeric_weights = numeric_weights
+        self.codes = np.column_stack(codes) if codes else np.empty((len(frame), 0), dtype=int)
+        self.code_weights = code_weights
+
+    def __len__(self):
+        return len(self.numeric)
+
+
+# weighted Gower distances between the users at rows and the users at columns (index arrays);
+# a feature missing for either user is left out of that pair's average
+def gower_block(features, rows, columns):
+    total = np.zeros((len(rows), len(columns)))
+    weights = np.zeros((len(rows), len(columns)))
+    for k, weight in enumerate(features.numeric_weights):
+        difference = np.abs(features.numeric[rows, k][:, None] - features.numeric[columns, k][None, :])
+        present = ~np.isnan(difference)
+        total += weight * np.where(present, difference, 0.0)
+        weights += weight * present
+    for k, weight in enumerate(features.code_weights):
+        row_codes, column_codes = features.codes[rows, k][:, None], features.codes[columns, k][None, :]
+        present = (row_codes >= 0) & (column_codes >= 0)
+        total += weight * (present & (row_codes != column_codes))
+        weights += weight * present
+    return np.divide(total, weights, out=np.zeros_like(total), where=weights > 0)
+
+
+# square matrix of distances between the given users, built one block of rows at a time
+def gower_matrix(features, index, block_size=BLOCK_SIZE):
+    distances = np.empty((len(index), len(index)))
+    for start in range(0, len(index), block_size):
+        distances[start:start + block_size] = gower_block(features, index[start:start + block_size], index)
+    return distances
+
+
+# average linkage cut at n_clusters, for when scipy is not installed:
+# each step merges the closest pair, keeping every row's nearest cluster up to date
+def _average_linkage(distances, n_clusters):
+    d = distances.astype(float)
+    size = len(d)
+    np.fill_diagonal(d, np.inf)
+    sizes = np.ones(size)
+    active = np.ones(size, dtype=bool)
+    labels = np.arange(size)
+    nearest = d.argmin(axis=1)
+    for _ in range(size - n_clusters):
+        rows = np.flatnonzero(active)
+        i = rows[np.argmin(d[rows, nearest[rows]])]
+        j = nearest[i]
+        merged = (sizes[i] * d[i] + sizes[j] * d[j]) / (sizes[i] + sizes[j])
+        d[i], d[:, i] = merged, merged
+        d[i, i] = np.inf
+        d[j], d[:, j] = np.inf, np.inf
+        sizes[i] += sizes[j]
+        active[j] = False
+        labels[labels == j] = i
+
+        # rows that pointed at i or j look again; rows now closer to i point at it
+        stale = active & ((nearest == i) | (nearest == j))
+        stale[i] = True
+        nearest[stale] = d[stale].argmin(axis=1)
+        closer = active & (d[:, i] < d[np.arange(size), nearest])
+        nearest[closer] = i
+    return pd.factorize(labels)[0]
+
+
+def average_linkage(distances, n_clusters):
+    if linkage is None:
+        return _average_linkage(distances, n_clusters)
+    tree = linkage(squareform(distances, checks=False), method="average")
+    return fcluster(tree, n_clusters, criterion="maxclust") - 1
+
+
+# cluster of every user: 0 for the largest cluster, 1 for the next and so on
+def cluster_users(frame, n_clusters=3, weights=FEATURE_WEIGHTS, sample_size=SAMPLE_SIZE,
+                  block_size=BLOCK_SIZE, seed=0):
+    features = GowerFeatures(frame, weights)
+    users = len(features)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(users, sample_size, replace=False)) if users > sample_size else np.arange(users)
+
+    sample_labels = average_linkage(gower_matrix(features, sample, block_size), n_clusters)
+    # average distance to the members of each cluster, as in the linkage
+    members = np.eye(sample_labels.max() + 1)[sample_labels]
+    members /= members.sum(axis=0)
+
+    labels = np.empty(users, dtype=int)
+    labels[sample] = sample_labels
+    rest = np.setdiff1d(np.arange(users), sample)
+    for start in range(0, len(rest), block_size):
+        block = rest[start:start + block_size]
+        labels[block] = (gower_block(features, block, sample) @ members).argmin(axis=1)
+
+    # number the clusters by size so the result does not depend on the merge order
+    order = np.argsort(-np.bincount(labels), kind="stable")
+    return np.argsort(order)[labels]
+
+
+# "Group n" names for the clusters; with previous names, each cluster keeps the name
+# it shares the most users with, so re-clustering does not reshuffle the tab labels
+def name_clusters(labels, previous=None):
+    names = {}
+    if previous is not None:
+        overlap = pd.crosstab(labels, np.asarray(previous))
+        for cluster, name in overlap.stack().sort_values(ascending=False).index:
+            if cluster not in names and name not in names.values():
+                names[cluster] = name
+    taken = set(names.values())
+    spare = (f"Group {number}" for number in range(1, len(labels) + 2) if f"Group {number}" not in taken)
+    for cluster in np.unique(labels):
+        if cluster not in names:
+            names[cluster] = next(spare)
+    return pd.Series(labels).map(names).to_numpy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cluster the users and write them with the new Cluster column")
+    parser.add_argument("path", nargs="?", default="pivot_user_info_clustered.csv")
+    # never the input by default: the weights are not tuned to reproduce the current clusters,
+    # so overwriting would lose the only copy of the labels the tabs describe
+    parser.add_argument("--output", required=True, help="csv to write (a new file, to compare before replacing)")
+    parser.add_argument("--clusters", type=int, default=3)
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if os.path.abspath(args.output) == os.path.abspath(args.path):
+        parser.error("--output must not be the input file")
+
+    users = pd.read_csv(args.path)
+    labels = cluster_users(users, args.clusters, sample_size=args.sample_size, seed=args.seed)
+    previous = users["Cluster"] if "Cluster" in users else None
+    clusters = name_clusters(labels, previous)
+    if previous is not None:
+        print(pd.crosstab(pd.Series(clusters, name="new"), previous.rename("previous")))
+    users["Cluster"] = clusters
+    users.to_csv(args.output, index=False)
+    print(f"{len(users)} users in {args.clusters} clusters written to {args.output}; to use them, replace "
+          f"{args.path} with it, review the group descriptions of tab 3-5 and run star_schema.py")
@@ -0,0 +1,31 @@
+import multiprocessing
+import os
+
+# settings, read from the environment so the same code runs locally and behind gunicorn
+
+
+def _flag(name, default="0"):
+    return os.environ.get(name, default).lower() in ("1", "true", "yes")
+
+
+HOST = os.environ.get("MIBOLSILLO_HOST", "127.0.0.1")
+PORT = int(os.environ.get("MIBOLSILLO_PORT", 8050))
+# the dev server's reloader and debug tools roughly halve throughput, so they stay off unless asked for
+DEBUG = _flag("MIBOLSILLO_DEBUG")
+# gunicorn worker processes and threads per worker; callbacks only read the shared data, so threads are safe
+WORKERS = int(os.environ.get("MIBOLSILLO_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+THREADS = int(os.environ.get("MIBOLSILLO_THREADS", 1))
+# seconds between checks of the data files for changes, which are then loaded without a restart (0 turns it off)
+RELOAD_INTERVAL = float(os.environ.get("MIBOLSILLO_RELOAD_INTERVAL", 60))
+# resident size a worker may spend on the data, in MB (unset means no cap)
+MAX_MEMORY_MB = os.environ.get("MIBOLSILLO_MAX_MEMORY_MB")
+# where the callbacks read the fact tables from (see storage.py): "pandas" loads every file into memory,
+# "sqlite" queries the database at SQLITE_PATH and only loads the user dimension
+STORAGE = os.environ.get("MIBOLSILLO_STORAGE", "pandas")
+SQLITE_PATH = os.environ.get("MIBOLSILLO_SQLITE_PATH", "mibolsillo.db")
+# figures kept per callback; the profile x health x checkbox callbacks only have a few dozen inputs
+FIGURE_CACHE_SIZE = int(os.environ.get("MIBOLSILLO_FIGURE_CACHE_SIZE", 128))
+# above this many points a user scatter plot is binned and drawn with WebGL
+SCATTER_MAX_POINTS = int(os.environ.get("MIBOLSILLO_SCATTER_MAX_POINTS", 5000))
+# bins per axis in the large-data mode, so a plot holds at most SCATTER_BINS ** 2 points per color
+SCATTER_BINS = int(os.environ.get("MIBOLSILLO_SCATTER_BINS", 60))
@@ -1,41 +1,153 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 
-trans_clus = pd.read_csv("trans_clustered.csv")
-payments_clus = pd.read_csv("payments_clustered.csv")
-user_clus = pd.read_csv("pivot_user_info_clustered.csv")
-
-# spending
-monthly_data = trans_clus.pivot_table(values="Value", index=["Internal_ID", "Year-Month"], aggfunc='sum').reset_index()
-
-# transactions
-freq = trans_clus.pivot_table(values="Value", index=["Internal_ID", "Year-Month"], aggfunc='count').reset_index()
-monthly_data = monthly_data.merge(freq, on=["Internal_ID", "Year-Month"])
-monthly_data.rename(columns={"Value_y": "Transactions"}, inplace=True)
-monthly_data.rename(columns={"Value_x": "Spending"}, inplace=True)
-
-# nonessential spending
-calc_essential = pd.pivot_table(trans_clus, values='ID', index=['Internal_ID', "Year-Month"],
-                                columns=['Expense_Importance'], aggfunc='count').reset_index()
-calc_essential.fillna(0, inplace=True)
-monthly_data = monthly_data.merge(calc_essential, on=["Internal_ID", "Year-Month"])
-monthly_data["NonEssential_Percentage"] = monthly_data['Non-Essential'] / monthly_data['Transactions']
-monthly_data["Essential_Percentage"] = monthly_data['Essential'] / monthly_data['Transactions']
-
-# spending of total limit
-Average_Total_Limit = pd.pivot_table(trans_clus, values="Limite_Total",
-                                     index=["Internal_ID", "Year-Month"], aggfunc="mean").reset_index()
-monthly_data = monthly_data.merge(Average_Total_Limit, on=["Internal_ID", "Year-Month"])
-monthly_data.rename(columns={"Limite_Total": "Average_Total_Limit"}, inplace=True)
-monthly_data["Spending to Limit"] = monthly_data["Spending"] / monthly_data["Average_Total_Limit"]
+from data_loader import load_csv
+from star_schema import STAR_FILES
+
+KEYS = ["Internal_ID", "Year-Month"]
+
+# per-user-month metrics, all computed in one groupby over the transactions
+#   name -> (source column, aggregation)
+AGGREGATES = {
+    "Spending": ("Value", "sum"),
+    "Transactions": ("Value", "count"),
+    # counted over all rows, a few transactions have no Value
+    "Essential": ("Is_Essential", "sum"),
+    "Non-Essential": ("Is_NonEssential", "sum"),
+    "Average_Total_Limit": ("Limite_Total", "mean")
+}
+
+# row-level inputs of the aggregates, derived before grouping
+ROW_COLUMNS = {
+    "Is_Essential": lambda trans: trans["Expense_Importance"] == "Essential",
+    "Is_NonEssential": lambda trans: trans["Expense_Importance"] == "Non-Essential"
+}
+
+# metrics computed from the aggregated row: name -> (numerator, denominator)
+RATIOS = {
+    "NonEssential_Percentage": ("Non-Essential", "Transactions"),
+    "Essential_Percentage": ("Essential", "Transactions"),
+    "Spending to Limit": ("Spending", "Average_Total_Limit")
+}
+
+GROUPS = ["Cluster", "overall_health"]
+
+COLUMNS = KEYS + ["Spending", "Transactions", "Essential", "Non-Essential", "NonEssential_Percentage",
+                  "Essential_Percentage", "Average_Total_Limit", "Spending to Limit"] + GROUPS
+
+# how stored values of each aggregation combine with a new batch in append_transactions
+# (a mean is combined as a sum weighted by its count column); other aggregations, like median or
+# nunique, cannot be updated from the stored values and are not accepted
+COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max", "mean": "sum"}
+
+
+# add a metric to monthly_data, optionally with the row-level column it aggregates
+def register_metric(name, column, aggfunc, row_column=None):
+    if aggfunc not in COMBINE:
+        raise ValueError(f"{aggfunc!r} metrics cannot be appended to, use one of {', '.join(COMBINE)}")
+    if row_column is not None:
+        ROW_COLUMNS[column] = row_column
+    AGGREGATES[name] = (column, aggfunc)
+    COLUMNS.insert(-len(GROUPS), name)
+
+
+def register_ratio(name, numerator, denominator):
+    RATIOS[name] = (numerator, denominator)
+    COLUMNS.insert(-len(GROUPS), name)
+
+
+# rows behind each mean (the non-missing values of its source column), stored after COLUMNS
+# so append_transactions can weight the stored means by them: count column -> (source column, "count")
+def mean_counts():
+    return {f"{column}_Count": (column, "count") for column, aggfunc in AGGREGATES.values() if aggfunc == "mean"}
+
+
+def stored_columns():
+    return COLUMNS + list(mean_counts())
+
+
+def add_ratios(monthly_data):
+    for name, (numerator, denominator) in RATIOS.items():
+        monthly_data[name] = monthly_data[numerator] / monthly_data[denominator]
+    return monthly_data
+
 
 # append health and clusters for grouping
-temp = user_clus[["Internal_ID", "Cluster", "overall_health"]]
-monthly_data = monthly_data.merge(temp, on="Internal_ID")
+def add_groups(monthly_data, user_clus):
+    temp = user_clus[["Internal_ID"] + GROUPS]
+    return monthly_data.merge(temp, on="Internal_ID")
+
+
+# one scan: derive the row-level inputs, then a single groupby with every aggregate
+def aggregate_monthly(trans_clus):
+    sources = {column for column, _ in AGGREGATES.values() if column not in ROW_COLUMNS}
+    rows = trans_clus[KEYS + sorted(sources)].assign(
+        **{name: derive(trans_clus) for name, derive in ROW_COLUMNS.items()})
+    return rows.groupby(KEYS).agg(**AGGREGATES, **mean_counts()).reset_index()
+
+
+def build_monthly_data(trans_clus, user_clus):
+    return add_groups(add_ratios(aggregate_monthly(trans_clus)), user_clus)[stored_columns()]
+
+
+def _row_keys(frame):
+    return pd.MultiIndex.from_frame(frame[KEYS])
+
+
+def _merge_rows(monthly_data, batch):
+    batch = batch.reindex(columns=monthly_data.columns)
+    kept = monthly_data[~_row_keys(monthly_data).isin(_row_keys(batch))]
+    return pd.concat([kept, batch]).sort_values(KEYS).reset_index(drop=True)
+
+
+# fold newly arrived transactions into an existing monthly_data
+# only the (Internal_ID, Year-Month) rows the new transactions touch are recomputed,
+# by combining the new aggregates with the stored ones
+def append_transactions(monthly_data, new_trans, user_clus):
+    batch = aggregate_monthly(new_trans)
+    missing = [column for column in batch.columns if column not in monthly_data]
+    if missing:
+        raise ValueError(f"monthly_data has no {', '.join(missing)} column, rebuild it without --append first")
+    touched = monthly_data[_row_keys(monthly_data).isin(_row_keys(batch))]
+    combined = pd.concat([touched[batch.columns], batch])
+    # means are carried through the combination as sums weighted by the rows behind them
+    # (a missing mean has no rows, so it adds nothing)
+    means = {name: f"{column}_Count" for name, (column, aggfunc) in AGGREGATES.items() if aggfunc == "mean"}
+    for name, count in means.items():
+        combined[name] = combined[name] * combined[count]
+    upserted = combined.groupby(KEYS).agg(
+        {**{name: COMBINE[aggfunc] for name, (_, aggfunc) in AGGREGATES.items()},
+         **{count: "sum" for count in mean_counts()}})
+    for name, count in means.items():
+        upserted[name] = upserted[name] / upserted[count]
+    upserted = add_groups(add_ratios(upserted.reset_index()), user_clus)[stored_columns()]
+    return _merge_rows(monthly_data, upserted)
+
+
+# replace the rows of reopened months by rebuilding them from all of their transactions
+def recompute_months(monthly_data, month_trans, user_clus):
+    return _merge_rows(monthly_data, build_monthly_data(month_trans, user_clus))
 
-# export data
-# monthly_data.to_csv("monthly_data.csv")
 
-print(monthly_data["Year-Month"].min())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build monthly_data.csv from the transaction facts")
+    parser.add_argument("--append", metavar="CSV", help="new transactions to add to the existing monthly_data.csv")
+    parser.add_argument("--recompute", metavar="CSV",
+                        help="all transactions of reopened months, whose rows are rebuilt")
+    args = parser.parse_args()
 
+    user_clus = load_csv(STAR_FILES["user_clus"])
+    if args.append or args.recompute:
+        monthly_data = load_csv("monthly_data.csv").drop(columns="Unnamed: 0", errors="ignore")
+        if args.recompute:
+            monthly_data = recompute_months(monthly_data, pd.read_csv(args.recompute), user_clus)
+        if args.append:
+            monthly_data = append_transactions(monthly_data, pd.read_csv(args.append), user_clus)
+    else:
+        monthly_data = build_monthly_data(load_csv(STAR_FILES["trans_clus"]), user_clus)
 
+    # export data
+    monthly_data.to_csv("monthly_data.csv")
+    print(monthly_data["Year-Month"].min(), monthly_data["Year-Month"].max(), len(monthly_data))
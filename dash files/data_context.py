@@ -0,0 +1,167 @@
+import os
+import sys
+import threading
+
+from category_index import CategoryIndex
+from config import MAX_MEMORY_MB, SQLITE_PATH, STORAGE
+from data_loader import load_csv
+from derived_columns import USER_COLUMNS, add_derived_columns
+from monthly_cube import MonthlyCube
+from profile_controls import ProfileControls
+from schema import SCHEMAS
+from star_schema import STAR_FILES
+from user_aggregates import aggregates_memory_usage, build_user_aggregates
+from user_search import UserSearch
+
+# the slim fact tables and the user dimension written by star_schema.py, plus monthly_data
+DATA_FILES = {**STAR_FILES, "monthly_data": "monthly_data.csv"}
+
+
+# the files loaded into the context with a storage, by default the configured one
+def context_files(storage=STORAGE):
+    if storage == "pandas":
+        return DATA_FILES
+    return {"user_clus": STAR_FILES["user_clus"]}
+
+
+def _frame_bytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+# the one copy of the data shared by every tab layout and callback
+# trans_clus and payments_clus hold only per-row columns, user attributes live in user_clus
+# without the fact tables (a SQL storage backend serves them) only the user dimension structures are built
+class DataContext:
+    def __init__(self, user_clus, trans_clus=None, payments_clus=None, monthly_data=None):
+        self.trans_clus = trans_clus
+        self.payments_clus = payments_clus
+        self.user_clus = add_derived_columns(user_clus, USER_COLUMNS)
+        self.monthly_data = monthly_data
+
+        self.user_aggregates = self.monthly_cube = self.category_index = None
+        if trans_clus is not None:
+            # per-user aggregates for tab 1, built once so the callbacks only do a lookup
+            self.user_aggregates = build_user_aggregates(trans_clus, payments_clus)
+            # monthly averages per cluster and financial health for tab 3 and tab 4
+            self.monthly_cube = MonthlyCube(monthly_data)
+            # daily running totals per category for the tab 4 pies
+            self.category_index = CategoryIndex(trans_clus, user_clus)
+        # health options and user counts behind the profile dropdowns of tab 3, tab 4 and tab 5
+        self.profile_controls = ProfileControls(user_clus)
+        # prefix search behind the tab 1 user dropdown
+        self.user_search = UserSearch(self.user_clus)
+
+    # bytes held by each frame and by the derived aggregates
+    def memory_usage(self):
+        usage = {name: _frame_bytes(getattr(self, name)) for name in DATA_FILES if getattr(self, name) is not None}
+        if self.trans_clus is not None:
+            usage["user_aggregates"] = aggregates_memory_usage(self.user_aggregates)
+            usage["monthly_cube"] = self.monthly_cube.memory_usage()
+            usage["category_index"] = self.category_index.memory_usage()
+        usage["user_search"] = self.user_search.memory_usage()
+        return usage
+
+    def check_memory(self, max_mb):
+        total_mb = sum(self.memory_usage().values()) / 2 ** 20
+        if total_mb > max_mb:
+            raise MemoryError(f"data context needs {total_mb:.1f} MB, over the {max_mb} MB limit")
+
+
+# modification time and size of every data file (and the database of a SQL storage), to tell when they change
+def source_signature(folder="."):
+    files = list(context_files().values())
+    if STORAGE != "pandas":
+        files.append(SQLITE_PATH)
+    signature = []
+    for file in files:
+        try:
+            stat = os.stat(os.path.join(folder, file))
+            signature.append((file, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((file, None, None))
+    return tuple(signature)
+
+
+def load_context(folder=".", storage=STORAGE):
+    # taken before reading, so a file changed during the load is picked up by the next reload
+    signature = source_signature(folder)
+    frames = {name: load_csv(os.path.join(folder, file), SCHEMAS[file]) for name, file in context_files(storage).items()}
+    context = DataContext(**frames)
+    if MAX_MEMORY_MB:
+        context.check_memory(float(MAX_MEMORY_MB))
+    context.folder, context.signature = folder, signature
+    return context
+
+
+_context = None
+_reload_hooks = []
+_load_lock = threading.Lock()
+
+
+# the process-wide context, loaded on first use
+# a callback should call this once and keep the result, so it works on one snapshot even if a reload swaps it
+def get_context():
+    global _context
+    if _context is None:
+        with _load_lock:
+            if _context is None:
+                _context = load_context()
+    return _context
+
+
+# register a function to run after the data is reloaded (to drop anything derived from the old data)
+def on_reload(hook):
+    _reload_hooks.append(hook)
+    return hook
+
+
+# build a complete new context, then swap it in with one assignment: requests keep using
+# the old context while the new one loads and never see a half-built one
+def reload_context(folder="."):
+    global _context
+    with _load_lock:
+        context = load_context(folder)
+        _context = context
+        for hook in _reload_hooks:
+            hook()
+    return context
+
+
+# background thread reloading the context when the data files change
+# a change is only loaded once the files are the same on two polls in a row, so a csv that
+# is still being written is not read
+class DataWatcher(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name="data-watcher", daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        pending, failed = None, None
+        while not self._stopped.wait(self.interval):
+            context = get_context()
+            signature = source_signature(context.folder)
+            if signature in (context.signature, failed) or signature != pending:
+                pending = signature
+                continue
+            try:
+                reload_context(context.folder)
+            except Exception as error:
+                # keep serving the loaded data; the next change to the files is tried again
+                failed = signature
+                print(f"data reload failed, keeping the loaded data: {error!r}", file=sys.stderr)
+
+    def stop(self):
+        self._stopped.set()
+
+
+_watcher = None
+
+
+# start the watcher of this process (once; a forked worker starts its own)
+def start_watcher(interval):
+    global _watcher
+    if _watcher is None or not _watcher.is_alive():
+        _watcher = DataWatcher(interval)
+        _watcher.start()
+    return _watcher
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from schema import apply_schema, schema_version
+
+try:
+    import pyarrow.feather as feather
+    from pyarrow import ArrowException
+except ImportError:  # no columnar cache without pyarrow, every load parses the csv
+    feather = None
+
+CACHE_DIR = ".cache"
+# layout of the cached files; caches written with another layout are rebuilt
+CACHE_FORMAT = 2
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(path):
+    folder, name = os.path.split(path)
+    cache_path = os.path.join(folder, CACHE_DIR, os.path.splitext(name)[0] + ".feather")
+    return cache_path, cache_path + ".json"
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# write to a temporary file of this process first, so neither a crashed write nor another worker
+# rebuilding the same cache at the same time ever leaves a broken file behind
+def _replace(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _write_meta(meta_path, meta):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+    _replace(meta_path, write)
+
+
+def _write_cache(frame, cache_path, meta_path, meta):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # one uncompressed chunk per column, so a load can hand out views of the mapped file instead of
+    # concatenating chunks into new memory
+    _replace(cache_path, lambda tmp_path: feather.write_feather(frame, tmp_path, compression="uncompressed",
+                                                                chunksize=max(len(frame), 1)))
+    _write_meta(meta_path, meta)
+
+
+# the cached frame, or None when the copy cannot be read (it is then rebuilt from the csv)
+# numeric columns are views of the memory-mapped file: they take no memory of their own, the pages are
+# shared by every worker reading the same cache, and they are read-only
+def _read_cache(cache_path):
+    try:
+        return feather.read_table(cache_path, memory_map=True).to_pandas(split_blocks=True, self_destruct=True)
+    except (OSError, ArrowException):
+        return None
+
+
+def _read_csv(path, schema):
+    frame = pd.read_csv(path)
+    return frame if schema is None else apply_schema(frame, schema)
+
+
+# read a csv through a feather copy kept in .cache/ next to it, typed with the given schema
+# the copy is rebuilt when the csv or the schema changes: same mtime and size is trusted,
+# otherwise the content hash decides (a touched but unchanged file keeps its cache)
+# a frame read from the cache cannot be written in place: add columns or work on a copy
+def load_csv(path, schema=None):
+    if feather is None:
+        return _read_csv(path, schema)
+
+    cache_path, meta_path = _cache_paths(path)
+    stat = os.stat(path)
+    version = None if schema is None else schema_version(schema)
+    meta = _read_meta(meta_path)
+    digest = None
+    if (meta is not None and meta.get("schema") == version and meta.get("format") == CACHE_FORMAT
+            and os.path.exists(cache_path)):
+        frame = None
+        if meta["mtime"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            frame = _read_cache(cache_path)
+        else:
+            digest = _file_hash(path)
+            if meta["sha256"] == digest:
+                frame = _read_cache(cache_path)
+                if frame is not None:
+                    meta.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+                    try:
+                        _write_meta(meta_path, meta)
+                    except OSError:
+                        pass
+        if frame is not None:
+            return frame
+
+    frame = _read_csv(path, schema)
+    meta = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest or _file_hash(path),
+            "schema": version, "format": CACHE_FORMAT}
+    try:
+        _write_cache(frame, cache_path, meta_path, meta)
+    except OSError:
+        # read-only checkout: still serve the data, just without a cache
+        return frame
+    # serve the mapped copy like any later load, so the parsed frame's memory is released
+    cached = _read_cache(cache_path)
+    return frame if cached is None else cached
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+
+# users in Sao Paulo against everyone else, for the tab 5 location pie
+def location(user_clus):
+    return pd.Categorical(np.where(user_clus["Cidade"] == "SAO PAULO", "In SAO PAULO", "Outside SAO PAULO"),
+                          categories=["In SAO PAULO", "Outside SAO PAULO"])
+
+
+# columns derived from the user dimension: name -> function of the frame
+# they are added once when the data is loaded, so callbacks only ever read the shared frames
+USER_COLUMNS = {"location": location}
+
+
+def add_derived_columns(frame, columns):
+    for name, function in columns.items():
+        frame[name] = function(frame)
+    return frame
@@ -0,0 +1,80 @@
+import functools
+import threading
+from collections import OrderedDict
+
+from config import FIGURE_CACHE_SIZE as MAX_ENTRIES
+from data_context import on_reload
+
+_caches = []
+
+
+# least-recently-used map from callback inputs to the serialised figure
+class FigureCache:
+    def __init__(self, maxsize=MAX_ENTRIES):
+        self.maxsize = maxsize
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+            return figure
+
+    # a figure computed before the last clear() belongs to the old data and is dropped
+    def put(self, key, figure, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# checklist values arrive as lists, which cannot be dict keys
+def _key(args):
+    return tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+
+
+# figure.to_dict(), or a tuple of dicts for a callback with several figure outputs
+def _serialise(figure):
+    if isinstance(figure, tuple):
+        return tuple(_serialise(part) for part in figure)
+    return figure.to_dict()
+
+
+# memoise a figure callback on its inputs; the figure is serialised to a dict once and reused
+def cached_figure(function):
+    cache = FigureCache()
+    _caches.append(cache)
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        key = _key(args)
+        figure = cache.get(key)
+        if figure is None:
+            generation = cache.generation
+            figure = _serialise(function(*args))
+            cache.put(key, figure, generation)
+        return figure
+
+    wrapper.cache = cache
+    return wrapper
+
+
+# empty every figure cache when the data is reloaded
+@on_reload
+def clear_all():
+    for cache in _caches:
+        cache.clear()
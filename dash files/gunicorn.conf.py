@@ -0,0 +1,24 @@
+# names in this file are gunicorn settings, so import the values rather than the config module
+from config import HOST, PORT, RELOAD_INTERVAL, THREADS, WORKERS
+from data_context import get_context, start_watcher
+
+# run from this folder with: gunicorn Dash:server
+bind = f"{HOST}:{PORT}"
+workers = WORKERS
+threads = THREADS
+
+# import Dash.py once in the master process
+preload_app = True
+
+
+# Dash.py builds nothing at import, so load the data in the master before the workers fork;
+# they then share those pages copy-on-write instead of each loading a copy
+def when_ready(server):
+    get_context()
+
+
+# threads do not survive the fork, so every worker starts its own data watcher
+# (a reloaded context is private to the worker; only the preloaded one is shared)
+def post_fork(server, worker):
+    if RELOAD_INTERVAL > 0:
+        start_watcher(RELOAD_INTERVAL)
@@ -0,0 +1,128 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# the financial health columns of the user summary (pivot_user_info_clustered.csv, which star_schema.py
+# turns into user_dim.csv), computed from the fact tables
+# every score only depends on the user's own rows, so rescoring some users (rescore_users)
+# gives the same values as rescoring everyone (score_users)
+
+# each input is cut into low / medium / high: below the first cut is low, from the second cut up is high
+# input column -> (category column, cuts, category labels, index column)
+SCORES = {
+    "NonEssential_Percentage": ("NonEssential_Category", (0.58, 0.8),
+                                ["LowNonEssential", "MediumNonEssential", "HighNonEssential"], "Nonessential_Index"),
+    # late payments per year: none (under one every two years) is low, three or more is high
+    "Num_Months_Paid_Notontime_Normalized": ("Ontime_Category", (0.5, 3.0),
+                                             ["LowNotontime", "MediumNotontime", "HighNotontime"], "Ontime_index"),
+    "Monthly_Spending_Percentage_of_Limit": ("Spending_to_Limit_Category", (0.3, 0.5),
+                                             ["Low_Spending_to_Limit", "Medium_Spending_to_Limit",
+                                              "High_Spending_to_Limit"], "Spending_to_Limit_index")
+}
+
+# index of a low, medium and high category
+INDEX_VALUES = np.array([0.1, 0.3, 0.5])
+
+# health_index = weighted sum of the indexes, added in this order
+# (the order matters at the 0.28 cut, where the existing labels were computed this way)
+HEALTH_WEIGHTS = {"Ontime_index": 0.7, "Spending_to_Limit_index": 0.2, "Nonessential_Index": 0.1}
+
+# health_index below the first cut is high health, from the second cut up is low health
+HEALTH_CUTS = (0.13, 0.28)
+HEALTH_LABELS = ["high", "medium", "low"]
+
+SCORE_COLUMNS = (list(SCORES) + [column for category, _, _, index in SCORES.values() for column in (category, index)]
+                 + ["health_index", "overall_health"])
+
+
+# share of non-essential transactions per user
+def nonessential_percentage(trans):
+    return (trans["Expense_Importance"] != "Essential").groupby(trans["Internal_ID"], observed=True).mean()
+
+
+# late payments per user, scaled to a year of monthly payments
+def late_payments_per_year(payments):
+    late = payments["Latency"] == "Late"
+    return late.groupby(payments["Internal_ID"], observed=True).mean() * 12
+
+
+# average over the user's months of spending / average credit limit in the month
+def spending_to_limit(trans):
+    monthly = trans.groupby(["Internal_ID", "Year-Month"], observed=True).agg(spending=("Value", "sum"),
+                                                                             limit=("Limite_Total", "mean"))
+    return (monthly["spending"] / monthly["limit"]).groupby(level="Internal_ID", observed=True).mean()
+
+
+# the three inputs of the scores per Internal_ID
+def health_inputs(trans, payments):
+    return pd.DataFrame({
+        "NonEssential_Percentage": nonessential_percentage(trans),
+        "Num_Months_Paid_Notontime_Normalized": late_payments_per_year(payments),
+        "Monthly_Spending_Percentage_of_Limit": spending_to_limit(trans)
+    })
+
+
+# level (0 low, 1 medium, 2 high) of each value, -1 where it is missing
+# (np.digitize alone would put a NaN in the top level)
+def _levels(values, cuts):
+    return np.where(np.isnan(values), -1, np.digitize(values, cuts))
+
+
+# categories, indexes and overall health from the inputs
+# a missing input (no transactions or no payments) leaves its category and index empty,
+# and with them the health index and overall health
+def score_inputs(inputs):
+    scores = inputs.copy()
+    for column, (category, cuts, labels, index) in SCORES.items():
+        level = _levels(scores[column].to_numpy(dtype=float), cuts)
+        scores[category] = np.where(level >= 0, np.array(labels, dtype=object)[level], np.nan)
+        scores[index] = np.where(level >= 0, INDEX_VALUES[level], np.nan)
+
+    health_index = sum(weight * scores[index] for index, weight in HEALTH_WEIGHTS.items())
+    level = _levels(health_index.to_numpy(), HEALTH_CUTS)
+    scores["overall_health"] = np.where(level >= 0, np.array(HEALTH_LABELS, dtype=object)[level], np.nan)
+    scores["health_index"] = health_index.round(2)
+    return scores[SCORE_COLUMNS]
+
+
+def score_users(trans, payments):
+    return score_inputs(health_inputs(trans, payments))
+
+
+# rescore only the given users, from their own rows, and update them in a score table;
+# users not in the table yet (new customers) are added to it
+def rescore_users(scores, trans, payments, users):
+    trans = trans[trans["Internal_ID"].isin(users)]
+    payments = payments[payments["Internal_ID"].isin(users)]
+    # a user without any rows left gets empty scores, as in a full rescore
+    updated = score_users(trans, payments).reindex(pd.Index(users).unique())
+    new_users = updated.index.difference(scores.index)
+    if len(new_users):
+        # nullable integers, so the other columns of the new rows are left empty without turning ints into floats
+        scores = scores.astype({column: "Int64" for column in scores.columns
+                                if pd.api.types.is_integer_dtype(scores[column])})
+        scores = scores.reindex(scores.index.append(new_users).rename(scores.index.name))
+    else:
+        scores = scores.copy()
+    scores.loc[updated.index, SCORE_COLUMNS] = updated
+    return scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the financial health columns of the user summary")
+    parser.add_argument("path", nargs="?", default="pivot_user_info_clustered.csv")
+    parser.add_argument("--output", help="csv to write (default: overwrite path)")
+    parser.add_argument("--users", type=int, nargs="*", help="Internal_IDs to rescore (default: all users)")
+    args = parser.parse_args()
+
+    trans, payments = pd.read_csv("trans_facts.csv"), pd.read_csv("payments_facts.csv")
+    users = pd.read_csv(args.path).set_index("Internal_ID")
+    before = users["overall_health"].copy()
+    # by default every user of the file and of the fact tables, so new customers are added as with --users
+    ids = args.users or users.index.union(trans["Internal_ID"].unique()).union(payments["Internal_ID"].unique())
+    users = rescore_users(users, trans, payments, ids)
+    users.reset_index().to_csv(args.output or args.path, index=False)
+    changed = users["overall_health"].fillna("") != before.reindex(users.index).fillna("")
+    print(f"{changed.sum()} users changed overall_health; {args.output or args.path} written, "
+          "run star_schema.py and create_monthly_data.py to refresh user_dim.csv and monthly_data.csv")
@@ -0,0 +1,45 @@
+import numpy as np
+import plotly.express as px
+
+from config import SCATTER_BINS as BINS, SCATTER_MAX_POINTS as MAX_POINTS
+
+
+# users averaged per (color, x bin, y bin), with the number of users in each bin
+def bin_points(frame, x, y, color, bins=BINS):
+    points = frame[[x, y, color]].dropna(subset=[x, y])
+    # nothing left to bin (every x or y missing): no bins, so the plot is empty
+    if points.empty:
+        return points[[color, x, y]].assign(Users=np.zeros(0, dtype=int))
+    keys = [color]
+    for axis in (x, y):
+        values = points[axis].to_numpy(dtype=float)
+        low, high = values.min(), values.max()
+        width = (high - low) / bins or 1.0
+        points[f"{axis} bin"] = np.minimum(((values - low) / width).astype(int), bins - 1)
+        keys.append(f"{axis} bin")
+    binned = points.groupby(keys, observed=True, sort=False).agg(**{x: (x, "mean"), y: (y, "mean"),
+                                                                    "Users": (x, "size")})
+    return binned.reset_index(level=color).reset_index(drop=True)
+
+
+# one marker per user while that is small enough to send, otherwise one WebGL marker per bin,
+# sized by the number of users in it
+def user_scatter(frame, x, y, color, title, hovertemplate=None, marker_size=15, max_points=MAX_POINTS):
+    if len(frame) <= max_points:
+        fig = px.scatter(frame, x=x, y=y, color=color, title=title)
+        fig.update_traces(marker=dict(size=marker_size))
+        if hovertemplate is not None:
+            fig.update_traces(hovertemplate=hovertemplate)
+        return fig
+
+    binned = bin_points(frame, x, y, color)
+    fig = px.scatter(binned, x=x, y=y, color=color, size="Users", size_max=marker_size * 2,
+                     render_mode="webgl", title=title)
+    if hovertemplate is not None:
+        users = "<Br>Users: %{marker.size}"
+        if "<extra>" in hovertemplate:
+            hovertemplate = hovertemplate.replace("<extra>", users + "<extra>", 1)
+        else:
+            hovertemplate += users
+        fig.update_traces(hovertemplate=hovertemplate)
+    return fig
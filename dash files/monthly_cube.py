@@ -0,0 +1,44 @@
+import pandas as pd
+
+# per-user monthly metrics averaged in the Tab 3/Tab 4 graphs
+CUBE_METRICS = ["Spending", "Spending to Limit", "NonEssential_Percentage"]
+
+GROUPS = ["Cluster", "overall_health"]
+
+# every way the graphs slice the users: all of them, by cluster, by health, by cluster and health
+LEVELS = [(), ("Cluster",), ("overall_health",), ("Cluster", "overall_health")]
+
+
+# sums and counts of each metric per (Year-Month, Cluster, overall_health), rolled up to every level
+# so any average series is a dictionary lookup, however many users there are
+class MonthlyCube:
+    def __init__(self, monthly_data, metrics=CUBE_METRICS):
+        self.metrics = list(metrics)
+        grouped = monthly_data.groupby(["Year-Month"] + GROUPS, observed=True)[self.metrics]
+        base_sums, base_counts = grouped.sum(), grouped.count()
+
+        self.sums, self.counts, self._averages = {}, {}, {}
+        for level in LEVELS:
+            keys = ["Year-Month"] + list(level)
+            sums = base_sums.groupby(level=keys, observed=True).sum()
+            counts = base_counts.groupby(level=keys, observed=True).sum()
+            self.sums[level], self.counts[level] = sums, counts
+            averages = sums / counts
+            if level:
+                self._averages[level] = {key if isinstance(key, tuple) else (key,): rows.droplevel(list(level))
+                                         for key, rows in averages.groupby(level=list(level), observed=True)}
+            else:
+                self._averages[level] = {(): averages}
+        self._empty = pd.DataFrame(columns=self.metrics, index=pd.Index([], name="Year-Month"), dtype=float)
+
+    # average of a metric per Year-Month over the users matching the given groups,
+    # e.g. series("Spending", Cluster="Group 1", overall_health="high")
+    def series(self, metric, **groups):
+        level = tuple(name for name in GROUPS if name in groups)
+        key = tuple(groups[name] for name in level)
+        averages = self._averages[level].get(key, self._empty)
+        return averages[metric].reset_index()
+
+    def memory_usage(self):
+        return sum(int(frame.memory_usage(deep=True).sum())
+                   for tables in (self.sums, self.counts) for frame in tables.values())
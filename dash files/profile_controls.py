@@ -0,0 +1,34 @@
+# labels of the financial health levels in the second dropdown
+HEALTH_LABELS = {"high": "High Financial Health", "medium": "Medium Financial Health",
+                 "low": "Low Financial Health"}
+
+ALL_OPTION = {"label": "All Users", "value": "All"}
+
+
+# the profile/financial health dropdowns of tab 3, tab 4 and tab 5 are answered in the browser
+# from tables built once: the health options of each cluster and the number of users
+# per cluster and per (cluster, health)
+class ProfileControls:
+    def __init__(self, user_clus):
+        self.total = len(user_clus)
+        self.cluster_counts = {cluster: int(size) for cluster, size in
+                               user_clus.groupby("Cluster", observed=True, sort=False).size().items()}
+        self.counts = {}
+        for (cluster, health), size in user_clus.groupby(["Cluster", "overall_health"], observed=True,
+                                                         sort=False).size().items():
+            self.counts.setdefault(cluster, {})[health] = int(size)
+
+        # health levels in order of appearance; a cluster with a single level only offers "All"
+        self.options = {}
+        for cluster, health in user_clus.groupby("Cluster", observed=True, sort=False)["overall_health"]:
+            levels = health.unique()
+            if len(levels) == 1:
+                self.options[cluster] = [ALL_OPTION]
+            else:
+                self.options[cluster] = [{"label": HEALTH_LABELS[level], "value": level} for level in levels]
+                self.options[cluster].append(ALL_OPTION)
+
+    # everything the clientside callbacks need, as the data of a dcc.Store
+    def store_data(self):
+        return {"total": self.total, "cluster_counts": self.cluster_counts, "counts": self.counts,
+                "options": self.options, "default_options": [ALL_OPTION]}
@@ -0,0 +1,108 @@
+import hashlib
+import json
+
+import pandas as pd
+
+# dtypes for the clustered csv files
+#   "category": low-cardinality strings, mostly user attributes repeated on every row
+#   "integer":  ints downcast to the smallest type that holds the loaded values
+#   "float32":  floats whose values survive 32 bits exactly
+# money, ratios and dates are left as read so sums and string date comparisons do not change
+USER_SCHEMA = {
+    "Transactions_Start_Date": "category",
+    "Transactions_End_Date": "category",
+    "User_Spending_Behavior": "category",
+    "NonEssential_Category": "category",
+    "Ontime_Category": "category",
+    "Spending_to_Limit_Category": "category",
+    "overall_health": "category",
+    "Cluster": "category",
+    "Sexo": "category",
+    "Cidade": "category",
+    "Top_Cate": "category",
+    "Internal_ID": "integer",
+    "Total_Transactions": "integer",
+    "Essential": "integer",
+    "Non-Essential": "integer",
+    "Idade": "integer"
+}
+
+PERSON_SCHEMA = {
+    "Nome": "category",
+    "Estado": "category",
+    "Safra_Abertura": "integer",
+    "Period": "integer"
+}
+
+TRANS_SCHEMA = {
+    **USER_SCHEMA,
+    **PERSON_SCHEMA,
+    "Pais_Estabelecimento": "category",
+    "Cidade_Estabelecimento": "category",
+    "Expense_Importance": "category",
+    "Grupo_Estabelecimento": "category",
+    "Limite_Disp": "integer",
+    "Limite_Total": "integer",
+    "Over_Limit": "integer",
+    "Confidence": "float32",
+    "Month": "integer",
+    "Day": "integer",
+    "Year": "integer"
+}
+
+PAYMENTS_SCHEMA = {
+    **USER_SCHEMA,
+    **PERSON_SCHEMA,
+    "Category": "category",
+    "Category_Number": "integer",
+    "Latency": "category",
+    "Latency_cate": "integer",
+    "Days_Late": "integer"
+}
+
+MONTHLY_SCHEMA = {
+    "Internal_ID": "integer",
+    "Transactions": "integer",
+    "Cluster": "category",
+    "overall_health": "category"
+}
+
+SCHEMAS = {
+    "trans_clustered.csv": TRANS_SCHEMA,
+    "payments_clustered.csv": PAYMENTS_SCHEMA,
+    "pivot_user_info_clustered.csv": USER_SCHEMA,
+    "monthly_data.csv": MONTHLY_SCHEMA,
+    "trans_facts.csv": TRANS_SCHEMA,
+    "payments_facts.csv": PAYMENTS_SCHEMA,
+    "user_dim.csv": {**USER_SCHEMA, **PERSON_SCHEMA}
+}
+
+
+# short fingerprint of a schema, so cached copies are rebuilt when it changes
+def schema_version(schema):
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def apply_schema(frame, schema):
+    frame = frame.copy()
+    for column, kind in schema.items():
+        if column not in frame:
+            continue
+        if kind == "category":
+            frame[column] = frame[column].astype("category")
+        elif kind == "integer":
+            frame[column] = pd.to_numeric(frame[column], downcast="integer")
+        else:
+            frame[column] = frame[column].astype(kind)
+    return frame
+
+
+# bytes per column before and after applying the schema
+def memory_report(frame, schema):
+    typed = apply_schema(frame, schema)
+    report = pd.DataFrame({"before": frame.memory_usage(deep=True, index=False),
+                           "after": typed.memory_usage(deep=True, index=False)})
+    report.loc["Total"] = report.sum()
+    report["saved"] = report["before"] - report["after"]
+    report["saved %"] = (100 * report["saved"] / report["before"]).round(1)
+    return report
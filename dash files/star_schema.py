@@ -0,0 +1,49 @@
+import pandas as pd
+
+# the clustered files repeat every user attribute on each transaction/payment row
+# this splits them into slim fact tables plus one user dimension table, joined on Internal_ID
+
+# per-user columns found on the fact rows but not in pivot_user_info_clustered.csv
+PERSON_COLUMNS = ["ID", "Nome", "Estado", "Safra_Abertura", "Monthly average ticket", "Confidence"]
+
+# columns that share a name with a user column but change from one transaction to the next
+# (the user file's Limite_Total is the user's average, the fact rows carry the limit at purchase time)
+FACT_COLUMNS = ["Limite_Total"]
+
+STAR_FILES = {
+    "trans_clus": "trans_facts.csv",
+    "payments_clus": "payments_facts.csv",
+    "user_clus": "user_dim.csv"
+}
+
+
+# one row per user: the user summary plus the person columns taken from the fact rows
+def user_dimension(users, trans, payments):
+    person = pd.concat([trans, payments])
+    person = person[["Internal_ID"] + [c for c in PERSON_COLUMNS if c in person]].drop_duplicates("Internal_ID")
+    return users.merge(person, on="Internal_ID", how="left")
+
+
+# keep the join key and the columns that really vary row by row
+def fact_table(frame, user_dim):
+    user_columns = [c for c in user_dim.columns if c != "Internal_ID" and c not in FACT_COLUMNS]
+    return frame.drop(columns=[c for c in user_columns if c in frame])
+
+
+def split_star(trans, payments, users):
+    user_dim = user_dimension(users, trans, payments)
+    return fact_table(trans, user_dim), fact_table(payments, user_dim), user_dim
+
+
+# join user attributes onto fact rows, only where a caller needs them
+def with_user_columns(facts, user_dim, columns):
+    return facts.merge(user_dim[["Internal_ID"] + list(columns)], on="Internal_ID", how="left")
+
+
+if __name__ == "__main__":
+    trans_facts, payments_facts, user_dim = split_star(pd.read_csv("trans_clustered.csv"),
+                                                       pd.read_csv("payments_clustered.csv"),
+                                                       pd.read_csv("pivot_user_info_clustered.csv"))
+    trans_facts.to_csv(STAR_FILES["trans_clus"], index=False)
+    payments_facts.to_csv(STAR_FILES["payments_clus"], index=False)
+    user_dim.to_csv(STAR_FILES["user_clus"], index=False)
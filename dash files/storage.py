@@ -0,0 +1,242 @@
+import argparse
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import SQLITE_PATH, STORAGE
+from data_context import DATA_FILES, get_context, load_context
+from monthly_cube import CUBE_METRICS, GROUPS
+from user_aggregates import user_aggregate
+
+# the queries behind the callbacks, answered either from the in-memory structures of the data context
+# (PandasBackend) or pushed down as SQL to a SQLite file (SQLiteBackend), so the fact tables do not
+# have to fit in memory; MIBOLSILLO_STORAGE picks one (see config.STORAGE)
+#
+# both answer the same calls with the same frames:
+#   user_table(name, user)           per-user tab 1 table: "monthly_spending", "essential_spending", "latency"
+#   date_range()                     first and last Fixed_Date of the transactions
+#   range_totals(start, end)         the spending of a date range, for breakdown()
+#   breakdown(range_totals, **groups)   (spending per category, total spending) of the matching users
+#   average_series(metric, **groups)    monthly average of a monthly_data metric over the matching users
+
+
+class PandasBackend:
+    def __init__(self, context):
+        self.context = context
+
+    def user_table(self, name, user):
+        return user_aggregate(self.context.user_aggregates, name, user)
+
+    def date_range(self):
+        dates = self.context.trans_clus["Fixed_Date"]
+        return dates.min(), dates.max()
+
+    def range_totals(self, start_date, end_date):
+        return self.context.category_index.range_totals(start_date, end_date)
+
+    def breakdown(self, range_totals, **groups):
+        return self.context.category_index.breakdown(range_totals, **groups)
+
+    def average_series(self, metric, **groups):
+        return self.context.monthly_cube.series(metric, **groups)
+
+
+# columns copied from each csv into the database, with the indexes the queries use
+TABLES = {
+    "trans": (DATA_FILES["trans_clus"], ["Internal_ID", "Year-Month", "Fixed_Date", "Value", "Expense_Importance",
+                                         "Grupo_Estabelecimento"]),
+    "payments": (DATA_FILES["payments_clus"], ["Internal_ID", "Year-Month", "Latency"]),
+    "users": (DATA_FILES["user_clus"], ["Internal_ID"] + GROUPS),
+    "monthly": (DATA_FILES["monthly_data"], ["Year-Month"] + GROUPS + CUBE_METRICS)
+}
+
+INDEXES = {
+    "trans": [["Internal_ID", "Year-Month"], ["Fixed_Date"]],
+    "payments": [["Internal_ID"]],
+    "users": [["Internal_ID"]],
+    "monthly": [GROUPS]
+}
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+# copy the csv files into a new SQLite database, a chunk at a time so they never have to fit in memory;
+# the file is replaced in one step when it is complete
+def build_database(path=SQLITE_PATH, folder=".", chunksize=100000):
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with sqlite3.connect(tmp_path) as connection:
+        for table, (file, columns) in TABLES.items():
+            chunks = pd.read_csv(os.path.join(folder, file), usecols=columns, chunksize=chunksize)
+            for number, chunk in enumerate(chunks):
+                chunk[columns].to_sql(table, connection, if_exists="replace" if number == 0 else "append",
+                                      index=False)
+            for number, columns in enumerate(INDEXES[table]):
+                connection.execute(f"CREATE INDEX {table}_{number} ON {table} ({', '.join(map(_quote, columns))})")
+    connection.close()
+    os.replace(tmp_path, path)
+
+
+class SQLiteBackend:
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    # one read-only connection per thread and process (a connection must not cross a fork),
+    # reopened when build_database has replaced the file
+    def _connection(self):
+        key = (os.getpid(), os.stat(self.path).st_mtime_ns)
+        if getattr(self._local, "key", None) != key:
+            if getattr(self._local, "key", (None,))[0] == key[0]:
+                self._local.connection.close()
+            self._local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.key = key
+        return self._local.connection
+
+    def _query(self, sql, params=()):
+        return pd.read_sql_query(sql, self._connection(), params=params)
+
+    # the same rows and columns as user_aggregates builds (TOTAL is 0 for a month without values, like sum)
+    def user_table(self, name, user):
+        if name == "monthly_spending":
+            sql = ('SELECT Internal_ID, "Year-Month", TOTAL(Value) AS Value FROM trans WHERE Internal_ID = ? '
+                   'GROUP BY "Year-Month" ORDER BY "Year-Month"')
+        elif name == "essential_spending":
+            sql = ('SELECT Internal_ID, "Year-Month", '
+                   'TOTAL(CASE WHEN Expense_Importance = \'Essential\' THEN Value END) AS Essential, '
+                   'TOTAL(CASE WHEN Expense_Importance = \'Non-Essential\' THEN Value END) AS "Non-Essential" '
+                   'FROM trans WHERE Internal_ID = ? AND Expense_Importance IS NOT NULL '
+                   'GROUP BY "Year-Month" ORDER BY "Year-Month"')
+        elif name == "latency":
+            sql = ('SELECT Internal_ID, Latency, COUNT("Year-Month") AS "Year-Month" FROM payments '
+                   'WHERE Internal_ID = ? AND Latency IS NOT NULL GROUP BY Latency ORDER BY Latency')
+        else:
+            raise KeyError(name)
+        # sqlite3 does not bind numpy integers, which is what ids taken from a frame are
+        return self._query(sql, (None if user is None else int(user),))
+
+    def date_range(self):
+        first, last = self._connection().execute("SELECT MIN(Fixed_Date), MAX(Fixed_Date) FROM trans").fetchone()
+        return first, last
+
+    # spending and rows per (cluster, health, category) in the range; breakdown() filters this small table
+    def range_totals(self, start_date, end_date):
+        columns = ", ".join(_quote(column) for column in GROUPS + ["Grupo_Estabelecimento"])
+        return self._query(f"SELECT {columns}, TOTAL(Value) AS Value, COUNT(*) AS size "
+                           "FROM trans LEFT JOIN users USING (Internal_ID) "
+                           f"WHERE Fixed_Date >= ? AND Fixed_Date <= ? GROUP BY {columns}",
+                           (start_date, end_date))
+
+    def breakdown(self, range_totals, **groups):
+        mask = np.ones(len(range_totals), dtype=bool)
+        for name, value in groups.items():
+            mask &= (range_totals[name] == value).to_numpy()
+        rows = range_totals[mask]
+        totals = rows.groupby("Grupo_Estabelecimento")["Value"].sum()
+        return totals, rows["Value"].sum()
+
+    def average_series(self, metric, **groups):
+        if metric not in CUBE_METRICS:
+            raise KeyError(metric)
+        # rows without a cluster or health are left out, as in the monthly cube
+        conditions = [f"{_quote(name)} IS NOT NULL" for name in GROUPS]
+        conditions += [f"{_quote(name)} = ?" for name in GROUPS if name in groups]
+        params = tuple(groups[name] for name in GROUPS if name in groups)
+        return self._query(f'SELECT "Year-Month", AVG({_quote(metric)}) AS {_quote(metric)} FROM monthly '
+                           f'WHERE {" AND ".join(conditions)} GROUP BY "Year-Month" ORDER BY "Year-Month"',
+                           params)
+
+
+_sqlite_backend = None
+
+
+# the configured backend; call it once per callback, like get_context()
+def get_storage():
+    global _sqlite_backend
+    if STORAGE == "pandas":
+        return PandasBackend(get_context())
+    if STORAGE == "sqlite":
+        if _sqlite_backend is None:
+            _sqlite_backend = SQLiteBackend(SQLITE_PATH)
+        return _sqlite_backend
+    raise ValueError(f"unknown storage {STORAGE!r}, expected 'pandas' or 'sqlite'")
+
+
+def _same_frame(expected, result):
+    expected, result = expected.reset_index(drop=True), result.reset_index(drop=True)
+    if list(expected.columns) != list(result.columns) or len(expected) != len(result):
+        return False
+    for column in expected.columns:
+        if pd.api.types.is_numeric_dtype(expected[column]):
+            if not np.allclose(expected[column].to_numpy(dtype=float), result[column].to_numpy(dtype=float),
+                               rtol=1e-9, equal_nan=True):
+                return False
+        elif not (expected[column].astype(str).to_numpy() == result[column].astype(str).to_numpy()).all():
+            return False
+    return True
+
+
+# compare every query of the two backends over all users, profiles and health levels and a set of date ranges;
+# returns the failing cases
+def parity_check(expected, result, users, clusters, healths, date_ranges):
+    failures = []
+    for name in ["monthly_spending", "essential_spending", "latency"]:
+        for user in users:
+            if not _same_frame(expected.user_table(name, user), result.user_table(name, user)):
+                failures.append(("user_table", name, user))
+    if tuple(expected.date_range()) != tuple(result.date_range()):
+        failures.append(("date_range",))
+
+    group_sets = [{}] + [{"Cluster": cluster} for cluster in clusters]
+    group_sets += [{"overall_health": health} for health in healths]
+    group_sets += [{"Cluster": cluster, "overall_health": health} for cluster in clusters for health in healths]
+    for start_date, end_date in date_ranges:
+        expected_range = expected.range_totals(start_date, end_date)
+        result_range = result.range_totals(start_date, end_date)
+        for groups in group_sets:
+            (expected_totals, expected_total), (totals, total) = (expected.breakdown(expected_range, **groups),
+                                                                  result.breakdown(result_range, **groups))
+            if not (_same_frame(expected_totals.sort_index().reset_index(), totals.sort_index().reset_index())
+                    and np.isclose(expected_total, total, rtol=1e-9)):
+                failures.append(("breakdown", start_date, end_date, groups))
+    for metric in CUBE_METRICS:
+        for groups in group_sets:
+            if not _same_frame(expected.average_series(metric, **groups), result.average_series(metric, **groups)):
+                failures.append(("average_series", metric, groups))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the SQLite storage, or check it against the pandas backend")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--path", default=SQLITE_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_database(args.path)
+        print(f"{args.path} written")
+    else:
+        # the pandas side always loads every file, whatever MIBOLSILLO_STORAGE is
+        context = load_context(storage="pandas")
+        user_clus = context.user_clus
+        first, last = PandasBackend(context).date_range()
+        rng = np.random.default_rng(0)
+        dates = np.sort(context.trans_clus["Fixed_Date"].dropna().unique())
+        date_ranges = [(first, last), ("2019-04-01", "2020-01-15"), ("2030-01-01", "2030-02-01")]
+        date_ranges += [tuple(np.sort(rng.choice(dates, 2))) for _ in range(20)]
+        failures = parity_check(PandasBackend(context), SQLiteBackend(args.path),
+                                users=user_clus["Internal_ID"].tolist() + [None, -1],
+                                clusters=user_clus["Cluster"].dropna().unique().tolist(),
+                                healths=user_clus["overall_health"].dropna().unique().tolist(),
+                                date_ranges=date_ranges)
+        print(f"{len(failures)} differences between the pandas and sqlite backends")
+        for failure in failures[:20]:
+            print(failure)
+        if failures:
+            raise SystemExit(1)
@@ -0,0 +1,25 @@
+import importlib
+import threading
+
+from data_context import on_reload
+
+# tab value -> module with a layout() function; a module is only imported when its tab is first shown
+TABS = ["tab1", "tab2", "tab3", "tab4", "tab5"]
+
+_layouts = {}
+_lock = threading.Lock()
+
+
+# the layout of a tab, built on first use and then reused for every page
+def tab_layout(tab):
+    with _lock:
+        if tab not in _layouts:
+            _layouts[tab] = importlib.import_module(tab).layout()
+        return _layouts[tab]
+
+
+# layouts embed data (dropdown options, figures), so rebuild them after a reload
+@on_reload
+def clear_layouts():
+    with _lock:
+        _layouts.clear()
@@ -0,0 +1,58 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# sort a table by user and map each user to their (start, stop) rows, so a callback only has to do
+# a dict lookup and a slice, without a frame object per user
+def _split_by_user(table):
+    table = table.sort_values("Internal_ID", kind="stable").reset_index(drop=True)
+    ids = table["Internal_ID"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else np.array([], dtype=int)
+    stops = np.r_[starts[1:], len(ids)].astype(int)
+    return table, dict(zip(ids[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+
+
+# monthly spending per user
+def monthly_spending_table(trans):
+    return trans.groupby(["Internal_ID", "Year-Month"])["Value"].sum().reset_index()
+
+
+# essential and non-essential spending per user and month
+def essential_spending_table(trans):
+    essential_spending = pd.pivot_table(trans, values="Value", index=["Internal_ID", "Year-Month"],
+                                        columns="Expense_Importance", aggfunc="sum", observed=True).reset_index()
+    # fill NA values with 0, as it means no purchase
+    return essential_spending.fillna(0)
+
+
+# number of months paid with each latency per user
+def latency_table(payments):
+    return pd.pivot_table(payments, values="Year-Month", index=["Internal_ID", "Latency"],
+                          aggfunc="count", observed=True).reset_index()
+
+
+# build every Tab 1 aggregate once, keyed by Internal_ID
+def build_user_aggregates(trans, payments):
+    return {
+        "monthly_spending": _split_by_user(monthly_spending_table(trans)),
+        "essential_spending": _split_by_user(essential_spending_table(trans)),
+        "latency": _split_by_user(latency_table(payments))
+    }
+
+
+# look up one user's rows of a prebuilt aggregate; unknown (or cleared) users get no rows
+def user_aggregate(aggregates, name, user):
+    table, offsets = aggregates[name]
+    start, stop = offsets.get(user, (0, 0))
+    return table.iloc[start:stop]
+
+
+# bytes held by the aggregates: the sorted tables and the offset maps
+def aggregates_memory_usage(aggregates):
+    usage = 0
+    for table, offsets in aggregates.values():
+        usage += int(table.memory_usage(deep=True).sum()) + sys.getsizeof(offsets)
+        usage += sum(sys.getsizeof(bounds) for bounds in offsets.values())
+    return usage
@@ -0,0 +1,50 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+# the Tab 1 figures of one user, built from the per-user tables of the storage (storage.py)
+# shared by the Dash callbacks and batch_reports.py
+
+
+# the payment on time pie chart
+def ontime_figure(latency):
+    fig = px.pie(data_frame=latency, names="Latency", values="Year-Month",
+                 title="User Payment History")
+    fig.update_traces(hovertemplate="Number of month: %{value}")
+    return fig
+
+
+# Monthly spending graph
+def monthly_spending_figure(monthly_spending):
+    fig = go.Figure(go.Scatter(x=monthly_spending["Year-Month"], y=monthly_spending["Value"],
+                               marker=dict(size=15), hovertemplate="Spending: $%{y} <extra></extra>"))
+    fig.update_layout(title="User Monthly Spending", xaxis_title="Year-Month",
+                      yaxis_title="Value")
+    return fig
+
+
+# Essential/Non-essential spending
+def essential_spending_figure(essential_spending):
+    trace1 = go.Scatter(x=essential_spending["Year-Month"], y=essential_spending["Essential"], name="Essential",
+                        mode="markers", marker=dict(color="rgb(0,0,230)", size=17), hovertemplate="$%{y}")
+    trace2 = go.Scatter(x=essential_spending["Year-Month"], y=essential_spending["Non-Essential"],
+                        name="Non-Essential", mode="markers",
+                        marker=dict(color="rgb(230,0,0)", size=17), hovertemplate="$%{y}")
+    fig = go.Figure()
+    fig.add_trace(trace1)
+    fig.add_trace(trace2)
+    fig.update_layout(title="User Monthly Essential and Non-Essential Spending",
+                      xaxis_title="Year-Month", yaxis_title="Value", width=1300)
+    return fig
+
+
+# report name -> (user table it is built from, figure builder), in the order of the Tab 1 page
+USER_FIGURES = {
+    "spending": ("monthly_spending", monthly_spending_figure),
+    "ontime": ("latency", ontime_figure),
+    "essential": ("essential_spending", essential_spending_figure)
+}
+
+
+# every Tab 1 figure of one user
+def user_figures(storage, user):
+    return {name: build(storage.user_table(table, user)) for name, (table, build) in USER_FIGURES.items()}
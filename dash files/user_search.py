@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# user dimension columns searched by prefix from the tab 1 dropdown
+SEARCH_FIELDS = ["Internal_ID", "Nome"]
+
+# most options sent to the browser per keystroke
+TOP_K = 20
+
+
+# sorted prefix index over the searchable fields, so the dropdown never ships every user:
+# a search is two binary searches and a slice of at most TOP_K matches per field
+class UserSearch:
+    def __init__(self, user_clus, fields=SEARCH_FIELDS):
+        self.fields = list(fields)
+        ids = user_clus["Internal_ID"].to_numpy()
+        names = user_clus["Nome"].astype(object)
+        # the name goes in the label as well, since the dropdown also filters options by label
+        labels = np.where(names.isna(), ids.astype(str), ids.astype(str) + " (" + names.astype(str) + ")")
+        self.labels = dict(zip(ids.tolist(), labels.tolist()))
+
+        keys, values = [], []
+        for field in self.fields:
+            column = user_clus[field].astype(object)
+            present = column.notna().to_numpy()
+            keys.append(column[present].astype(str).str.lower().to_numpy(dtype=str))
+            values.append(ids[present])
+        keys, values = np.concatenate(keys), np.concatenate(values)
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.values = keys[order], values[order]
+
+    # ids of up to k users with a field starting with text (case-insensitive), in key order
+    def search(self, text, k=TOP_K):
+        text = text.strip().lower()
+        first = np.searchsorted(self.keys, text, side="left")
+        last = np.searchsorted(self.keys, text + "\U0010ffff", side="left")
+        # a user matches at most once per field, so this slice holds k distinct users if there are k
+        candidates = self.values[first:min(last, first + k * len(self.fields))]
+        return pd.unique(candidates)[:k].tolist()
+
+    # dropdown options for the search text; the selected user is kept so its label still shows
+    def options(self, text, selected=None, k=TOP_K):
+        ids = self.search(text or "", k)
+        if selected in self.labels and selected not in ids:
+            ids.append(selected)
+        return [{"label": self.labels[user], "value": user} for user in ids]
+
+    def memory_usage(self):
+        return self.keys.nbytes + self.values.nbytes
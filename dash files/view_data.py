@@ -1,14 +1,23 @@
 import pandas as pd
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from data_context import get_context
+from schema import TRANS_SCHEMA, memory_report
+
 # read in the data
-trans_clus = pd.read_csv("trans_clustered.csv")
-payments_clus = pd.read_csv("payments_clustered.csv")
-user_clus = pd.read_csv("pivot_user_info_clustered.csv")
-monthly_data = pd.read_csv("monthly_data.csv")
+data = get_context()
+trans_clus = data.trans_clus
+payments_clus = data.payments_clus
+user_clus = data.user_clus
+monthly_data = data.monthly_data
 
 
 print(user_clus.columns)
+
+# resident size of the shared data, in bytes
+print(data.memory_usage())
+
+# memory saved on the transaction table by the dtype schema
+print(memory_report(pd.read_csv("trans_clustered.csv"), TRANS_SCHEMA))
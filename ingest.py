@@ -0,0 +1,84 @@
+import argparse
+
+import pandas as pd
+
+# streaming version of the cleaning steps at the top of Challenge.ipynb:
+# the raw statement dump is read in bounded chunks, cleaned with vectorised operations
+# and appended to the output csv, so the file never has to fit in memory
+
+# translate col names
+COLUMN_NAMES = {"id": "old_id", "celular": "phone", "safra_abertura": "branch",
+                "cidade": "city", "estado": "state", "idade": "age", "sexo": "gender", "limite_total": "total_limit",
+                "limite_disp": "available_limit", "data": "date", " valor ": "amount",
+                "grupo_estabelecimento": "category_spanish", "cidade_estabelecimento": "purchase_city",
+                "pais_estabelecimento": "purchase country"}
+
+# translate categories
+CATEGORY_NAMES = {"SERVI\x82O": "service", "FARMACIAS": "drugstore", "M.O.T.O.": "online",
+                  "ARTIGOS ELETRO": "electronics", "VAREJO": "convenience store",
+                  "LOJA DE DEPART": "department store", "VESTUARIO": "clothing", "HOSP E CLINICA": "health",
+                  "SEM RAMO": "other expenses", "SUPERMERCADOS": "supermarket",
+                  "MAT CONSTRUCAO": "construction material", "POSTO DE GAS": "gas", "RESTAURANTE": "restaurant",
+                  "MOVEIS E DECOR": "furniture", "CIA AEREAS": "airlines", "JOALHERIA": "jewelry",
+                  "TRANS FINANC": "financial transfers", "AGENCIA DE TUR": "tourism", "HOTEIS": "hotels",
+                  "AUTO PE\x82AS": "auto", "INEXISTENTE": "unclear", "ALUG DE CARROS": "auto"}
+
+DATE_FORMAT = "%d/%m/%y"
+
+
+# "1.784,13" -> 1784.13 with the statement's locale (thousands ".", decimal ",")
+def parse_amount(amount, thousands=".", decimal=","):
+    amount = amount.str.replace(thousands, "", regex=False).str.replace(decimal, ".", regex=False)
+    return pd.to_numeric(amount, errors="coerce")
+
+
+# number the raw ids in order of first appearance; id_map carries the numbering across chunks
+def map_ids(ids, id_map):
+    for raw_id in pd.unique(ids):
+        if raw_id not in id_map:
+            id_map[raw_id] = len(id_map)
+    return ids.map(id_map)
+
+
+def clean_chunk(chunk, id_map):
+    chunk = chunk.rename(columns=COLUMN_NAMES)
+    chunk["new_id"] = map_ids(chunk["old_id"], id_map)
+
+    chunk["category_spanish"] = chunk["category_spanish"].str.strip()
+    chunk["category"] = chunk["category_spanish"].map(CATEGORY_NAMES)
+
+    chunk["amount"] = parse_amount(chunk["amount"])
+
+    chunk["datetime"] = pd.to_datetime(chunk["date"], format=DATE_FORMAT)
+    chunk["year"] = chunk["datetime"].dt.year
+    chunk["month"] = chunk["datetime"].dt.month
+    chunk["day"] = chunk["datetime"].dt.day
+    return chunk
+
+
+def read_chunks(path, chunksize):
+    return pd.read_csv(path, sep=";", encoding="latin1", on_bad_lines="skip", dtype={"id": str, " valor ": str},
+                       chunksize=chunksize)
+
+
+# clean the raw dump chunk by chunk and append each chunk to out_path
+# rows keep their order in the raw file; sort per user downstream where it matters
+def ingest(path, out_path, chunksize=100000):
+    id_map = {}
+    rows = 0
+    for number, chunk in enumerate(read_chunks(path, chunksize)):
+        cleaned = clean_chunk(chunk, id_map)
+        cleaned.to_csv(out_path, mode="w" if number == 0 else "a", header=number == 0, index=False)
+        rows += len(cleaned)
+    return rows, id_map
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the raw statement dump in bounded-memory chunks")
+    parser.add_argument("path", nargs="?", default="data.csv")
+    parser.add_argument("out_path", nargs="?", default="data_clean.csv")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    rows, id_map = ingest(args.path, args.out_path, args.chunksize)
+    print(f"{rows} rows from {len(id_map)} users written to {args.out_path}")